@@ -0,0 +1,261 @@
+"""
+Runs bulk operations on the Assignment Tracker's classes from the command
+line, without starting Tk. It reads and writes the same files as the app,
+in the current directory or the one given with --directory.
+
+Usage:
+    python AssignmentCLI.py list [--class NAME ...] [--status STATUS ...] [--type TYPE ...]
+                                 [--overdue] [--search TEXT] [--format table|csv|json]
+    python AssignmentCLI.py add CLASS NAME [--due M/D/YYYY] [--time TIME] [--type TYPE]
+                                [--description TEXT] [--status STATUS]
+    python AssignmentCLI.py complete [--class NAME ...] [--id ID ...] [--overdue] [--due-before M/D/YYYY]
+    python AssignmentCLI.py export [--class NAME ...] [--format csv|json] [--output FILE]
+    python AssignmentCLI.py import CLASS FILE
+    python AssignmentCLI.py recompute [--class NAME ...]
+    python AssignmentCLI.py archive [--class NAME ...] [--past-due DAYS]
+    python AssignmentCLI.py history [--class NAME ...] [--format table|csv|json]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from AssignmentCore import (
+    STATUS_LIST, Assignment, bitmap_flags, import_assignments, indexes, open_classes,
+    parse_date, row_filters, search_index, sort_orders, writer,
+)
+
+FIELDS = ["Class", "ID", "Status", "Name", "Due Date", "Due Time", "Type", "Days Until Due", "Description"]
+
+
+def selected_classes(classes, names):
+    """
+    Returns the classes with the given names, or every class when names is empty
+
+    Raises:
+        KeyError: if there is no class with one of the names
+    """
+    if not names:
+        return list(classes)
+    missing = [name for name in names if classes.get(name) is None]
+    if missing:
+        raise KeyError(f"No class named {missing[0]!r}, the classes are: {', '.join(classes.names())}")
+    return [classes.get(name) for name in names]
+
+
+def matching_assignments(cls, statuses=None, types=None, overdue=False, search=None):
+    """
+    Yields the assignments of a class that pass the filters, by due date
+    """
+    rows = bitmap_flags(row_filters.rows(cls, statuses, types, overdue), len(cls.store.ids))
+    found = None
+    if search:
+        found = {assignment_id for file_name, assignment_id in search_index.search(search)
+                 if file_name == cls.file_name}
+    store = cls.store
+    for assignment_id in sort_orders.sorted_ids(cls, "due_date"):
+        row = store.row_of[assignment_id]
+        if rows[row] and (found is None or assignment_id in found):
+            yield Assignment.view(store, row)
+
+
+def record(cls, assignment):
+    return [cls.name, assignment.id] + assignment.to_row()[:7]
+
+
+def write_records(records, output_format, file):
+    """
+    Writes records (lists of FIELDS) to file as an aligned table, csv or JSON
+    """
+    if output_format == "json":
+        json.dump([dict(zip(FIELDS, values)) for values in records], file, indent=2)
+        file.write("\n")
+    elif output_format == "csv":
+        csv_writer = csv.writer(file)
+        csv_writer.writerow(FIELDS)
+        csv_writer.writerows(records)
+    else:
+        # the description is left out of the table so each assignment fits on one line
+        rows = [FIELDS[:-1]] + [[str(value) for value in values[:-1]] for values in records]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(FIELDS) - 1)]
+        for row in rows:
+            file.write("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + "\n")
+
+
+def list_command(classes, args):
+    records = []
+    for cls in selected_classes(classes, args.class_names):
+        for assignment in matching_assignments(cls, args.status, args.type, args.overdue, args.search):
+            records.append(record(cls, assignment))
+    write_records(records, args.format, sys.stdout)
+
+
+def add_command(classes, args):
+    cls = selected_classes(classes, [args.class_name])[0]
+    parse_date(args.due)
+    assignment = Assignment(args.status, args.name, args.due, args.time, args.type, "", args.description)
+    cls.add(assignment)
+    print(assignment.id)
+
+
+def complete_command(classes, args):
+    if not (args.id or args.overdue or args.due_before):
+        raise ValueError("Say which assignments to complete with --id, --overdue or --due-before")
+    if args.id and len(args.class_names) != 1:
+        raise ValueError("--id needs exactly one --class, since ids are only unique within a class")
+    before = parse_date(args.due_before).toordinal() if args.due_before else None
+
+    for cls in selected_classes(classes, args.class_names):
+        if args.id:
+            missing = [assignment_id for assignment_id in args.id if assignment_id not in cls.store.row_of]
+            if missing:
+                raise KeyError(f"{cls.name} has no assignment with id {missing[0]}")
+            assignments = [cls.get(assignment_id) for assignment_id in args.id]
+        else:
+            assignments = matching_assignments(cls, [status for status in STATUS_LIST if status != "Complete"],
+                                               overdue=args.overdue)
+        changed = 0
+        for assignment in list(assignments):
+            if assignment.complete:
+                continue
+            ordinal = cls.store.due_ordinals[assignment.row]
+            if before is not None and not 0 < ordinal < before:
+                continue
+            fields = assignment.to_row()[:7]
+            fields[0] = "Complete"
+            cls.edit(assignment, *fields)
+            changed += 1
+        print(f"{cls.name}: {changed} marked complete")
+
+
+def export_command(classes, args):
+    records = []
+    for cls in selected_classes(classes, args.class_names):
+        records.extend(record(cls, Assignment.view(cls.store, row)) for row in cls.store.live_rows())
+    if args.output:
+        with open(args.output, "w", newline="") as file:
+            write_records(records, args.format, file)
+    else:
+        write_records(records, args.format, sys.stdout)
+
+
+def import_command(classes, args):
+    cls = selected_classes(classes, [args.class_name])[0]
+    counts = import_assignments(cls, args.file)
+    added = counts.pop("added")
+    skipped = ", ".join(f"{count} {reason}" for reason, count in counts.items())
+    print(f"{cls.name}: {added} added" + (f", skipped {skipped}" if skipped else ""))
+
+
+def recompute_command(classes, args):
+    for cls in selected_classes(classes, args.class_names):
+        cls.save_class()
+        print(f"{cls.name}: {len(cls.store.row_of)} assignments")
+
+
+def archive_command(classes, args):
+    for cls in selected_classes(classes, args.class_names):
+        print(f"{cls.name}: {cls.archive_done(args.past_due)} archived")
+
+
+def history_command(classes, args):
+    records = []
+    for cls in selected_classes(classes, args.class_names):
+        records.extend(record(cls, assignment) for assignment in cls.archived())
+    write_records(records, args.format, sys.stdout)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--directory", "-C", help="the folder with setup.csv and the class files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def class_filter(command):
+        command.add_argument("--class", dest="class_names", action="append", default=[], metavar="NAME",
+                             help="a class to use, can be given more than once (default: every class)")
+
+    command = commands.add_parser("list", help="print assignments, by due date")
+    class_filter(command)
+    command.add_argument("--status", action="append", choices=STATUS_LIST)
+    command.add_argument("--type", action="append")
+    command.add_argument("--overdue", action="store_true", help="only incomplete assignments that are past due")
+    command.add_argument("--search", help="only assignments with every word of the text")
+    command.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    command.set_defaults(run=list_command)
+
+    command = commands.add_parser("add", help="add an assignment to a class and print its id")
+    command.add_argument("class_name", metavar="CLASS")
+    command.add_argument("name")
+    command.add_argument("--due", default="", help="the due date as M/D/YYYY")
+    command.add_argument("--time", default="")
+    command.add_argument("--type", default="")
+    command.add_argument("--description", default="")
+    command.add_argument("--status", choices=STATUS_LIST, default="Not Started")
+    command.set_defaults(run=add_command)
+
+    command = commands.add_parser("complete", help="mark assignments complete")
+    class_filter(command)
+    command.add_argument("--id", type=int, action="append", help="an assignment id, needs one --class")
+    command.add_argument("--overdue", action="store_true", help="every incomplete assignment that is past due")
+    command.add_argument("--due-before", metavar="M/D/YYYY", help="every incomplete assignment due before the date")
+    command.set_defaults(run=complete_command)
+
+    command = commands.add_parser("export", help="write assignments as csv (which can be imported again) or JSON")
+    class_filter(command)
+    command.add_argument("--format", choices=["csv", "json"], default="csv")
+    command.add_argument("--output", help="the file to write (default: standard output)")
+    command.set_defaults(run=export_command)
+
+    command = commands.add_parser("import", help="import a syllabus csv or an iCalendar file into a class")
+    command.add_argument("class_name", metavar="CLASS")
+    command.add_argument("file")
+    command.set_defaults(run=import_command)
+
+    command = commands.add_parser("recompute", help="rewrite classes with today's days until due, compacting journals")
+    class_filter(command)
+    command.set_defaults(run=recompute_command)
+
+    command = commands.add_parser("archive", help="move complete assignments into each class's archive")
+    class_filter(command)
+    command.add_argument("--past-due", type=int, metavar="DAYS",
+                         help="also archive incomplete assignments due more than DAYS days ago")
+    command.set_defaults(run=archive_command)
+
+    command = commands.add_parser("history", help="print archived assignments")
+    class_filter(command)
+    command.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    command.set_defaults(run=history_command)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # the agenda and reminders are built for every class as it loads, which
+    # a one-off command doesn't need, and the search index only for --search
+    indexes[:] = [sort_orders, row_filters]
+    if getattr(args, "search", None):
+        indexes.insert(0, search_index)
+    try:
+        if args.directory:
+            os.chdir(args.directory)
+        args.run(open_classes(), args)
+    except BrokenPipeError:
+        # the output was piped into something like head that stopped reading
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (KeyError, ValueError, OSError, csv.Error) as error:
+        # a KeyError's message is quoted by str(), so it is taken from args;
+        # UnicodeDecodeError is a ValueError
+        message = error.args[0] if isinstance(error, KeyError) and error.args else error
+        print(f"{parser.prog}: error: {message}", file=sys.stderr)
+        return 1
+    finally:
+        writer.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
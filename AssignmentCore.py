@@ -0,0 +1,2770 @@
+"""
+The part of the Assignment Tracker that does not need a display: the
+assignment store, date parsing, csv and SQLite storage, the indexes over the
+loaded classes, the class registry and importing. It never imports tkinter,
+so scripts, tests and AssignmentCLI.py can use it without starting Tk
+"""
+import atexit
+import bisect
+import collections
+import concurrent.futures
+import cProfile
+import csv
+import functools
+import gzip
+import heapq
+from array import array
+from datetime import date, datetime, timedelta, timezone
+import io
+import itertools
+import json
+import mmap
+import os
+import pstats
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import traceback
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def resource_path(filename):
+    """_summary_
+
+    Args:
+        filename (string): the name of the file
+
+    Returns:
+        string:the path to the file
+    """
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, filename)
+    return filename
+
+
+def atomic_write(path, write, text=False):
+    """Replaces a file so that a crash leaves either the old file or the
+    whole new one: write(file) fills a temporary file next to it, which is
+    synced to disk and then moved over path
+
+    Args:
+        path (string): the file to replace
+        write (function): called with the open temporary file
+        text (bool): open the temporary file for csv text instead of bytes
+    """
+    temp_path = path + ".tmp"
+    with (open(temp_path, "w", newline='') if text else open(temp_path, "wb")) as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+JOURNAL_SUFFIX = ".log"
+CACHE_SUFFIX = ".cache"
+CACHE_MAGIC = b"ATCACHE1"
+CACHE_MIN_ROWS = 500
+ARCHIVE_SUFFIX = ".archive.gz"
+GZIP_MAGIC = b"\x1f\x8b"
+ARCHIVE_COMPRESSION = 6
+JOURNAL_COMPACT_BYTES = 256 * 1024
+DATABASE_NAME = "assignments.db"
+CLASS_INDEX = "classes.csv"
+PREFETCH_LIMIT = 20
+LOAD_BATCH = 1000
+SAVE_DELAY = 0.1
+DATE_CACHE_SIZE = 4096
+AGENDA_SIZE = 25
+AGENDA_OVERDUE = 5
+IMPORT_BATCH = 1000
+IMPORT_POOL_BYTES = 8 * 1024 * 1024
+PROFILE_SAMPLES = 1000
+PROFILE_LINES = 30
+END_OF_DAY = 24 * 60
+WORD = re.compile(r"\w+")
+
+
+def encode_record(record):
+    """Encodes a journal record as a single checksummed line
+
+    Args:
+        record (dict): the journal record to encode
+
+    Returns:
+        bytes: the line to append to the journal
+    """
+    payload = json.dumps(record, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line):
+    """Decodes a journal line written by encode_record
+
+    Args:
+        line (bytes): a single line from the journal, including the newline
+
+    Returns:
+        dict: the decoded record, or None if the line is torn or corrupt
+    """
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    checksum, payload = line[:8], line[9:-1]
+    try:
+        if int(checksum, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def record_id(record):
+    """
+    Returns the id of the assignment a journal record changes, or 0 for a
+    record written before assignments had ids
+    """
+    assignment_id = record["row"][7] if record["op"] == "add" and len(record["row"]) > 7 else record.get("id")
+    return assignment_id if isinstance(assignment_id, int) else 0
+
+
+def percentile(ordered, fraction):
+    """
+    Returns the value at the given fraction (0.5 for the median) of a sorted list
+    """
+    return ordered[round(fraction * (len(ordered) - 1))] if ordered else 0.0
+
+
+class Instruments:
+    """
+    Opt-in timers for the hot paths. Functions decorated with timed() record
+    how long each call takes while enabled is set, by the
+    ASSIGNMENT_TRACKER_PROFILE environment variable or in the Profiler
+    pop-up, keeping the last PROFILE_SAMPLES times for each name. While
+    disabled, a timed function only costs one extra check per call
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.samples = {}
+        self.counts = collections.Counter()
+        self.names = []
+        self.profile_next = None
+        self.last_profile = ""
+
+    def timed(self, name):
+        """
+        Returns a decorator that records the time of every call under name.
+        When profile_next is name, the next call is run under cProfile
+        """
+        if name not in self.names:
+            self.names.append(name)
+
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                if self.profile_next == name:
+                    self.profile_next = None
+                    return self._profile(name, function, args, kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples.setdefault(name, collections.deque(maxlen=PROFILE_SAMPLES))
+        samples.append(seconds)
+        self.counts[name] += 1
+
+    def _profile(self, name, function, args, kwargs):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - started)
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.last_profile = f"{name}\n{output.getvalue()}"
+
+    def stats(self):
+        """
+        Returns the calls, p50, p99 and total seconds for each name, the
+        times being from the samples that were kept
+        """
+        result = {}
+        for name, samples in list(self.samples.items()):
+            ordered = sorted(samples)
+            result[name] = (self.counts[name], percentile(ordered, 0.5), percentile(ordered, 0.99), sum(ordered))
+        return result
+
+    def dump(self, file_name):
+        """
+        Writes the stats, and the output of the last cProfile capture, to a JSON file
+        """
+        report = {
+            "stats": {
+                name: {"calls": calls, "p50_ms": p50 * 1000, "p99_ms": p99 * 1000, "total_ms": total * 1000}
+                for name, (calls, p50, p99, total) in sorted(self.stats().items())
+            },
+            "profile": self.last_profile,
+        }
+        with open(file_name, "w") as file:
+            json.dump(report, file, indent=2)
+
+    def reset(self):
+        self.samples = {}
+        self.counts = collections.Counter()
+        self.last_profile = ""
+
+
+instruments = Instruments(enabled=bool(os.environ.get("ASSIGNMENT_TRACKER_PROFILE")))
+timed = instruments.timed
+
+
+STATUS_LIST = ["Not Started", "In Progress", "Complete"]
+
+
+class CodeTable:
+    """
+    Gives each distinct string (a status, type or due time) a small integer
+    code so that rows only need to store the code
+    """
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        """
+        Returns the code for the given string, adding it if it is new
+        """
+        code = self.codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.values.append(sys.intern(value))
+                    self.codes[value] = code
+        return code
+
+
+STATUSES = CodeTable(STATUS_LIST)
+TYPES = CodeTable([""])
+TIMES = CodeTable([""])
+
+
+def parse_id(value):
+    """
+    Returns the assignment id stored in a csv field, or 0 if there is none
+    """
+    value = str(value).strip()
+    return int(value) if value.isdigit() else 0
+
+
+class InvalidDateError(ValueError):
+    """
+    Raised when a due date is not blank and not a valid M/D/YYYY date
+    """
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def read_due_date(s):
+    """
+    Parses a due date string. Results are cached by the raw string because
+    a class reuses a small set of due dates across many rows
+
+    Args:
+        s (string): the due date as typed, ex: 2/14/2025 or 02/14/2025
+
+    Returns:
+        tuple: the date as an ordinal (0 when s is blank, -1 when it is not a
+        valid date) and whether s is already written as M/D/YYYY
+    """
+    parts = s.split("/")
+    if len(parts) != 3:
+        return (0, s == "") if s.strip() == "" else (-1, False)
+
+    month, day, year = parts
+    if not (month.isdigit() and day.isdigit() and year.isdigit()):
+        # the fast path above covers dates typed as digits only, this one
+        # also allows spaces around each part
+        month, day, year = month.strip(), day.strip(), year.strip()
+        if not (month.isdigit() and day.isdigit() and year.isdigit()):
+            return -1, False
+
+    try:
+        ordinal = date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return -1, False
+    return ordinal, s == f"{int(month)}/{int(day)}/{int(year)}"
+
+
+def parse_date(s):
+    """
+    Parses a due date string typed as M/D/YYYY
+
+    Args:
+        s (string): the due date as typed
+
+    Returns:
+        date: the due date, or None if s is blank
+
+    Raises:
+        InvalidDateError: if s is not blank and not a valid date
+    """
+    ordinal = read_due_date(s)[0]
+    if ordinal < 0:
+        raise InvalidDateError(f"{s.strip()!r} is not a valid due date, use M/D/YYYY")
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def valid_date(s):
+    """
+    Returns True if s is blank or a valid M/D/YYYY date
+    """
+    return read_due_date(s)[0] >= 0
+
+
+_today = [0, 0.0]
+
+
+def today_ordinal():
+    """
+    Returns today's date as an ordinal. The date is only looked up again
+    once the cached day is over, so it is cheap to call for every row
+    """
+    now = time.time()
+    if now >= _today[1]:
+        today = date.today()
+        _today[0] = today.toordinal()
+        _today[1] = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    return _today[0]
+
+
+def days_until_due_column(ordinals, today):
+    """
+    Subtracts today from a whole column of due date ordinals in one pass,
+    using NumPy when it is installed
+
+    Args:
+        ordinals (array): due date ordinals, as in AssignmentStore.due_ordinals
+        today (int): today's date as an ordinal
+
+    Returns:
+        numpy.ndarray or array: the days until due for every row
+    """
+    if numpy is not None:
+        return numpy.frombuffer(ordinals, dtype=numpy.int32) - numpy.int32(today)
+    return array('i', [ordinal - today for ordinal in ordinals])
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_due_time(s):
+    """
+    Parses a due time typed as 11:59 PM, 5 pm or 23:59
+
+    Args:
+        s (string): the due time as typed
+
+    Returns:
+        int: the minutes after midnight, or END_OF_DAY when s is blank or not
+        a time, so those sort after every assignment due that day with a time
+    """
+    text = s.strip().upper()
+    suffix = ""
+    if text.endswith(("AM", "PM")):
+        text, suffix = text[:-2].strip(), text[-2:]
+
+    hours, _, minutes = text.partition(":")
+    if not hours.isdigit() or not (minutes == "" or minutes.isdigit()):
+        return END_OF_DAY
+    hours, minutes = int(hours), int(minutes or 0)
+
+    if suffix:
+        if not 1 <= hours <= 12:
+            return END_OF_DAY
+        hours = hours % 12 + (12 if suffix == "PM" else 0)
+    if hours > 23 or minutes > 59:
+        return END_OF_DAY
+    return hours * 60 + minutes
+
+
+def past_due(ordinal, minutes, now):
+    """
+    Returns whether something due on a date ordinal at minutes after
+    midnight (END_OF_DAY without a time) was due by the datetime now
+    """
+    return 0 < ordinal and (ordinal, minutes) <= (now.toordinal(), now.hour * 60 + now.minute)
+
+
+BIT_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+BIT_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def to_bitmap(flags):
+    """
+    Packs row flags into an int with bit n set when row n is flagged
+
+    Args:
+        flags: a bytes-like object (a bytearray or a NumPy bool array) with a 0 or 1 for every row
+    """
+    digits = bytes(flags)[::-1].translate(BIT_DIGITS)
+    return int(digits, 2) if digits else 0
+
+
+def bitmap_flags(bitmap, rows):
+    """
+    Unpacks a bitmap made by to_bitmap into a 0 or 1 byte for each of the given number of rows
+    """
+    flags = format(bitmap, "b").encode().translate(BIT_FLAGS)[::-1]
+    return flags[:rows].ljust(rows, b"\x00")
+
+
+def column_flags(column, value):
+    """
+    Returns a 0 or 1 for every row of an array column, 1 where it holds value
+    """
+    if numpy is not None:
+        return numpy.frombuffer(column, dtype=column.typecode) == value
+    return bytes(code == value for code in column)
+
+
+def format_due_date(d):
+    """
+    Formats a date the way due dates are typed in, as M/D/YYYY
+    """
+    return f"{d.month}/{d.day}/{d.year}"
+
+
+class AssignmentStore:
+    """
+    Holds the assignments of one class column by column instead of as one
+    object each. Due dates are day ordinals (0 when there is no valid date),
+    statuses, types and due times are codes into the shared CodeTables, and
+    a due date is only kept as a string when it was not typed as M/D/YYYY.
+    Removed rows are marked dead rather than deleted, so the row numbers
+    held by Assignment views stay valid.
+    Days until due are computed for the whole column at once the first time
+    they are needed each day, and patched in place when a due date changes
+    """
+    def __init__(self):
+        self.ids = array('q')
+        self.due_ordinals = array('i')
+        self.status_codes = array('H')
+        self.type_codes = array('I')
+        self.time_codes = array('I')
+        self.names = []
+        self.descriptions = []
+        self.raw_due_dates = {}
+        self.alive = bytearray()
+        self.row_of = {}
+        self._days_column = None
+        self._days_today = 0
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def append_row(self, fields):
+        """
+        Adds a row given as csv fields (status, name, due date, due time, type,
+        days until due, description and optionally id). A missing or duplicate
+        id is stored as 0 and has to be set with set_id()
+
+        Returns:
+            int: the row number
+        """
+        row = len(self.ids)
+        assignment_id = parse_id(fields[7]) if len(fields) > 7 else 0
+        if assignment_id in self.row_of:
+            assignment_id = 0
+        status = fields[0] if fields[0].strip() != "" else "Not Started"
+
+        self.ids.append(assignment_id)
+        self.status_codes.append(STATUSES.code(status))
+        self.names.append(fields[1])
+        self.due_ordinals.append(0)
+        self._set_due_date(row, fields[2])
+        self.time_codes.append(TIMES.code(fields[3]))
+        self.type_codes.append(TYPES.code(fields[4]))
+        self.descriptions.append(fields[6])
+        self.alive.append(1)
+        if assignment_id:
+            self.row_of[assignment_id] = row
+        return row
+
+    def update_row(self, row, fields):
+        """
+        Replaces the values of a row with csv fields, keeping its id
+        """
+        status = fields[0] if fields[0].strip() != "" else "Not Started"
+        self.status_codes[row] = STATUSES.code(status)
+        self.names[row] = fields[1]
+        self._set_due_date(row, fields[2])
+        self.time_codes[row] = TIMES.code(fields[3])
+        self.type_codes[row] = TYPES.code(fields[4])
+        self.descriptions[row] = fields[6]
+
+    def _set_due_date(self, row, due_date):
+        ordinal, canonical = read_due_date(due_date)
+        ordinal = max(ordinal, 0)
+        self.due_ordinals[row] = ordinal
+
+        column = self._days_column
+        if column is not None:
+            if row < len(column):
+                column[row] = ordinal - self._days_today
+            elif isinstance(column, array):
+                column.append(ordinal - self._days_today)
+            else:
+                self._days_column = None
+
+        if canonical:
+            self.raw_due_dates.pop(row, None)
+        else:
+            self.raw_due_dates[row] = due_date
+
+    def set_id(self, row, assignment_id):
+        self.ids[row] = assignment_id
+        self.row_of[assignment_id] = row
+
+    def kill(self, row):
+        """
+        Removes a row, leaving its slot behind as a dead row
+        """
+        del self.row_of[self.ids[row]]
+        self.alive[row] = 0
+        self.names[row] = ""
+        self.descriptions[row] = ""
+        self.raw_due_dates.pop(row, None)
+
+    def live_rows(self):
+        """
+        Returns the row numbers that have not been removed, in the order they were added
+        """
+        return itertools.compress(range(len(self.alive)), self.alive)
+
+    def compacted(self):
+        """
+        Returns a copy of the store without its removed rows, the same as
+        what parsing the csv it is saved to would give
+        """
+        live = list(self.live_rows())
+        store = AssignmentStore()
+        for name in ("ids", "due_ordinals", "status_codes", "type_codes", "time_codes"):
+            column = getattr(self, name)
+            setattr(store, name, array(column.typecode, itertools.compress(column, self.alive)))
+        store.names = list(itertools.compress(self.names, self.alive))
+        store.descriptions = list(itertools.compress(self.descriptions, self.alive))
+        store.raw_due_dates = {bisect.bisect_left(live, row): value for row, value in self.raw_due_dates.items()}
+        store.alive = bytearray(b"\x01") * len(live)
+        store.row_of = {assignment_id: row for row, assignment_id in enumerate(store.ids) if assignment_id}
+        return store
+
+    def days_column(self):
+        """
+        Returns the days until due of every row (meaningless where there is
+        no due date), recomputing the whole column when the day has changed
+        """
+        today = today_ordinal()
+        if self._days_column is None or self._days_today != today:
+            self._days_column = days_until_due_column(self.due_ordinals, today)
+            self._days_today = today
+        return self._days_column
+
+    def days_until_due(self, row):
+        """
+        Returns the days until a row is due, or "" if it has no due date
+        """
+        if not self.due_ordinals[row]:
+            return ""
+        return int(self.days_column()[row])
+
+    def due_date_string(self, row):
+        raw = self.raw_due_dates.get(row)
+        if raw is not None:
+            return raw
+        ordinal = self.due_ordinals[row]
+        return format_due_date(date.fromordinal(ordinal)) if ordinal else ""
+
+    def to_row(self, row):
+        """
+        Returns a row as csv fields
+        """
+        return [
+            STATUSES.values[self.status_codes[row]],
+            self.names[row],
+            self.due_date_string(row),
+            TIMES.values[self.time_codes[row]],
+            TYPES.values[self.type_codes[row]],
+            self.days_until_due(row),
+            self.descriptions[row],
+            self.ids[row] or None
+        ]
+
+
+def write_store_cache(path, store, key):
+    """
+    Writes the columns of a freshly loaded AssignmentStore to a binary
+    cache file: a JSON header (the key, the code tables and the section
+    sizes), the array columns as raw bytes, then the names and
+    descriptions as one NUL separated UTF-8 block
+
+    Args:
+        path (string): the cache file to write
+        store (AssignmentStore): a store with no removed rows
+        key (tuple): the mtime in ns, size and crc32 of the csv it was loaded from
+    """
+    strings = store.names + store.descriptions
+    if any("\0" in string for string in strings):
+        return
+    sections = [store.ids, store.due_ordinals, store.status_codes, store.type_codes, store.time_codes]
+    blob = "\0".join(strings).encode()
+    header = json.dumps({
+        "key": list(key),
+        "byteorder": sys.byteorder,
+        "rows": len(store.ids),
+        "statuses": STATUSES.values[:max(store.status_codes, default=0) + 1],
+        "types": TYPES.values[:max(store.type_codes, default=0) + 1],
+        "times": TIMES.values[:max(store.time_codes, default=0) + 1],
+        "raw_due_dates": store.raw_due_dates,
+        "sections": [[column.typecode, len(column) * column.itemsize] for column in sections],
+        "text": len(blob),
+    }).encode()
+
+    def write(file):
+        file.write(CACHE_MAGIC + struct.pack("<I", len(header)) + header)
+        for column in sections:
+            column.tofile(file)
+        file.write(blob)
+
+    atomic_write(path, write)
+
+
+def remap_codes(column, values, table):
+    """
+    Changes the codes of a cached column from the cache's code list to the
+    codes of the running program's CodeTable
+    """
+    mapping = [table.code(value) for value in values]
+    if mapping == list(range(len(mapping))):
+        return column
+    if numpy is not None:
+        codes = numpy.array(mapping, dtype=column.typecode)[numpy.frombuffer(column, dtype=column.typecode)]
+        return array(column.typecode, codes.tobytes())
+    return array(column.typecode, [mapping[code] for code in column])
+
+
+def read_store_cache(path):
+    """
+    Reads a cache file written by write_store_cache through mmap
+
+    Returns:
+        tuple: the key it was written with and the AssignmentStore, or
+        None when the file is missing, damaged or from another machine
+    """
+    try:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:8] != CACHE_MAGIC:
+                return None
+            header_size = struct.unpack("<I", data[8:12])[0]
+            header = json.loads(data[12:12 + header_size])
+            if header["byteorder"] != sys.byteorder:
+                return None
+
+            position = 12 + header_size
+            store = AssignmentStore()
+            columns = []
+            with memoryview(data) as view:
+                for typecode, size in header["sections"]:
+                    column = array(typecode)
+                    column.frombytes(view[position:position + size])
+                    columns.append(column)
+                    position += size
+                text = bytes(view[position:position + header["text"]]).decode()
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    rows = header["rows"]
+    if any(len(column) != rows for column in columns) or position + header["text"] > os.path.getsize(path):
+        return None
+    strings = text.split("\0") if rows else []
+    if len(strings) != 2 * rows:
+        return None
+
+    store.ids, store.due_ordinals = columns[0], columns[1]
+    store.status_codes = remap_codes(columns[2], header["statuses"], STATUSES)
+    store.type_codes = remap_codes(columns[3], header["types"], TYPES)
+    store.time_codes = remap_codes(columns[4], header["times"], TIMES)
+    store.names, store.descriptions = strings[:rows], strings[rows:]
+    store.raw_due_dates = {int(row): value for row, value in header["raw_due_dates"].items()}
+    store.alive = bytearray(b"\x01") * rows
+    store.row_of = {assignment_id: row for row, assignment_id in enumerate(store.ids) if assignment_id}
+    return tuple(header["key"]), store
+
+
+class CsvStorage:
+    """
+    Stores a class in its csv file (ex: class1.csv). When journaled, each
+    change is appended to classN.csv.log and the csv is only rewritten when
+    the journal is compacted
+    """
+    def __init__(self, file_name, journaled=True):
+        self.file_name = file_name
+        self.journal_name = file_name + JOURNAL_SUFFIX
+        self.cache_name = file_name + CACHE_SUFFIX
+        self.journaled = journaled
+        self._snapshot = (0, 0)
+        self._journal_size = 0
+        self._compact = False
+        # every id below this has been used, as read back by replay()
+        self.next_id = 1
+
+    def load_cached(self):
+        """
+        Returns the rows of the csv from its binary cache, already parsed
+        into an AssignmentStore, when the cache is fresh. It is fresh when
+        the csv has the size and mtime it was written for, or the same size
+        and crc32 if only the mtime changed
+
+        Returns:
+            AssignmentStore: the rows of the csv, or None to fall back to load()
+        """
+        cached = read_store_cache(resource_path(self.cache_name))
+        if cached is None:
+            return None
+        (mtime, size, crc), store = cached
+        try:
+            status = os.stat(resource_path(self.file_name))
+        except FileNotFoundError:
+            return None
+        if status.st_size != size:
+            return None
+        if status.st_mtime_ns != mtime:
+            with open(resource_path(self.file_name), 'rb') as file:
+                if zlib.crc32(file.read()) != crc:
+                    return None
+        self._snapshot = (size, crc)
+        return store
+
+    def save_cached(self, store):
+        """
+        Writes the binary cache for the csv as last loaded or saved, given
+        the store holding exactly its rows. A class under CACHE_MIN_ROWS
+        rows parses in a few milliseconds, so it gets no cache and an old
+        one is removed
+        """
+        size, crc = self._snapshot
+        try:
+            if len(store.ids) < CACHE_MIN_ROWS:
+                if os.path.exists(resource_path(self.cache_name)):
+                    os.remove(resource_path(self.cache_name))
+                return
+            status = os.stat(resource_path(self.file_name))
+            if status.st_size == size:
+                write_store_cache(resource_path(self.cache_name), store, (status.st_mtime_ns, size, crc))
+        except OSError:
+            traceback.print_exc()
+
+    def load(self):
+        """
+        Reads the csv file, creating it if it does not exist
+
+        Returns:
+            iterator: the rows of the csv file as lists of fields
+        """
+        try:
+            with open(resource_path(self.file_name), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            open(resource_path(self.file_name), 'w').close()
+            data = b""
+
+        self._snapshot = (len(data), zlib.crc32(data))
+        return csv.reader(io.StringIO(data.decode(), newline=''))
+
+    def replay(self):
+        """
+        Reads every intact record from the journal. A torn record at the end
+        (from a crash mid-write) is cut off, and a journal that belongs to a
+        different snapshot of the csv is discarded. The highest id the
+        journal has seen, even a discarded one, is kept in next_id so that
+        ids of removed assignments are never given out again
+
+        Returns:
+            list: the journal records to apply on top of the rows from load()
+        """
+        if not self.journaled:
+            return []
+
+        path = resource_path(self.journal_name)
+        try:
+            with open(path, 'rb') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            self._journal_size = 0
+            return []
+
+        records = []
+        valid_size = 0
+        stale = False
+        for number, line in enumerate(lines):
+            record = decode_record(line)
+            if record is None:
+                break
+            if number == 0:
+                if record.get("op") != "base":
+                    break
+                self.next_id = max(self.next_id, record.get("next_id", 1))
+                stale = not self._matches_snapshot(record)
+            else:
+                self.next_id = max(self.next_id, record_id(record) + 1)
+                records.append(record)
+            valid_size += len(line)
+
+        if stale:
+            # the csv already has these changes, only the ids they used are kept
+            self._start_journal(self.next_id)
+            return []
+        if valid_size == 0:
+            os.remove(path)
+        elif valid_size != sum(len(line) for line in lines):
+            with open(path, 'r+b') as file:
+                file.truncate(valid_size)
+        self._journal_size = valid_size
+        return records
+
+    def _matches_snapshot(self, header):
+        return (header.get("size"), header.get("crc")) == self._snapshot
+
+    def _base(self, next_id):
+        size, crc = self._snapshot
+        return encode_record({"op": "base", "size": size, "crc": crc, "next_id": next_id})
+
+    def _start_journal(self, next_id):
+        """
+        Replaces the journal with one holding only its base record, which
+        keeps the id high-water mark once the csv has every change
+        """
+        data = self._base(next_id)
+        atomic_write(resource_path(self.journal_name), lambda file: file.write(data))
+        self._journal_size = len(data)
+
+    def record(self, record, next_id):
+        """
+        Appends a single change to the journal
+        """
+        self.record_many([record], next_id)
+
+    def record_many(self, records, next_id):
+        """
+        Appends a batch of changes to the journal with a single write and
+        fsync. next_id, the id the class will give out next, goes in the
+        base record when this starts the journal
+        """
+        path = resource_path(self.journal_name)
+        data = b"".join(encode_record(record) for record in records)
+        if self._journal_size == 0:
+            data = self._base(next_id) + data
+
+        with open(path, 'ab') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        self._journal_size += len(data)
+
+    def needs_compaction(self):
+        return self._compact or self._journal_size > JOURNAL_COMPACT_BYTES
+
+    def request_compaction(self):
+        """
+        Makes the next flush compact the journal however small it is, used
+        after many rows are removed at once so the csv shrinks right away
+        """
+        self._compact = True
+
+    def save(self, rows, next_id):
+        """
+        Replaces the csv atomically with the given rows and, when journaled,
+        starts the journal again with only a base record. Cls only calls
+        this under its write lock after recording every pending change, so
+        the rows include the whole journal. A crash after the csv is
+        replaced leaves a journal whose base no longer matches it, which
+        replay() discards
+
+        Args:
+            rows (list): every row of the class as csv fields
+            next_id (int): the id the class will give out next
+        """
+        # cleared first, so a compaction requested while saving is not lost
+        self._compact = False
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        data = buffer.getvalue().encode()
+
+        atomic_write(resource_path(self.file_name), lambda file: file.write(data))
+        self._snapshot = (len(data), zlib.crc32(data))
+        if self.journaled:
+            self._start_journal(next_id)
+
+
+class Database:
+    """
+    A SQLite database shared by the classes stored in it, with one table
+    that has a class column and indexes on due date, status and type
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS assignments (
+            class TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            name TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            due_ordinal INTEGER,
+            due_time TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            PRIMARY KEY (class, id)
+        );
+        CREATE INDEX IF NOT EXISTS assignments_due ON assignments (class, due_ordinal, due_time);
+        CREATE INDEX IF NOT EXISTS assignments_status ON assignments (class, status);
+        CREATE INDEX IF NOT EXISTS assignments_type ON assignments (class, type);
+        CREATE TABLE IF NOT EXISTS id_marks (
+            class TEXT PRIMARY KEY,
+            next_id INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.schema)
+
+
+_databases = {}
+
+
+def open_database(file_name=DATABASE_NAME):
+    """
+    Returns the Database for the given file, opening it the first time
+    """
+    path = resource_path(file_name)
+    if path not in _databases:
+        _databases[path] = Database(path)
+    return _databases[path]
+
+
+class SqliteStorage:
+    """
+    Stores a class as the rows of the assignments table whose class column
+    is class_key. Changes are written straight to their row, so there is
+    nothing to compact. The id high-water mark of the class is kept in the
+    id_marks table
+    """
+    journaled = True
+
+    def __init__(self, class_key, database=None):
+        self.class_key = class_key
+        self.database = database or open_database()
+        self.next_id = 1
+
+    def load(self):
+        """
+        Streams the rows of the class from a cursor in batches of LOAD_BATCH.
+        The cursor is on a connection of its own, which reads one consistent
+        snapshot of the database (it is in WAL mode) while the SaveWriter
+        goes on writing through the shared connection
+
+        Returns:
+            iterator: the rows as tuples of csv fields
+        """
+        connection = sqlite3.connect(self.database.path)
+        try:
+            cursor = connection.execute(
+                "SELECT status, name, due_date, due_time, type, '', description, id"
+                " FROM assignments WHERE class = ? ORDER BY rowid",
+                (self.class_key,)
+            )
+            while batch := cursor.fetchmany(LOAD_BATCH):
+                yield from batch
+        finally:
+            connection.close()
+
+    def replay(self):
+        # changes are already in the table, only the id high-water mark is read
+        with self.database.lock:
+            row = self.database.connection.execute(
+                "SELECT next_id FROM id_marks WHERE class = ?", (self.class_key,)
+            ).fetchone()
+        self.next_id = row[0] if row else 1
+        return []
+
+    def load_cached(self):
+        # rows come out of SQLite already split into columns, so there is no cache
+        return None
+
+    def save_cached(self, store):
+        pass
+
+    def needs_compaction(self):
+        return False
+
+    def request_compaction(self):
+        # deleted rows are already gone from the table
+        pass
+
+    def _values(self, fields):
+        ordinal = read_due_date(fields[2])[0]
+        return (
+            fields[0],
+            fields[1],
+            fields[2],
+            ordinal if ordinal > 0 else None,
+            fields[3],
+            fields[4],
+            fields[6],
+        )
+
+    def _save_mark(self, connection, next_id):
+        connection.execute(
+            "INSERT INTO id_marks (class, next_id) VALUES (?, ?)"
+            " ON CONFLICT (class) DO UPDATE SET next_id = max(next_id, excluded.next_id)",
+            (self.class_key, next_id)
+        )
+
+    def record(self, record, next_id):
+        """
+        Writes a single change in its own transaction
+        """
+        self.record_many([record], next_id)
+
+    def record_many(self, records, next_id):
+        """
+        Writes a batch of changes and the id high-water mark in one transaction
+        """
+        with self.database.lock, self.database.connection as connection:
+            self._save_mark(connection, next_id)
+            for record in records:
+                match record["op"]:
+                    case "add":
+                        connection.execute(
+                            "INSERT OR REPLACE INTO assignments (status, name, due_date, due_ordinal,"
+                            " due_time, type, description, class, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            self._values(record["row"]) + (self.class_key, record["row"][7])
+                        )
+                    case "edit":
+                        connection.execute(
+                            "UPDATE assignments SET status = ?, name = ?, due_date = ?, due_ordinal = ?,"
+                            " due_time = ?, type = ?, description = ? WHERE class = ? AND id = ?",
+                            self._values(record["row"]) + (self.class_key, record["id"])
+                        )
+                    case "delete":
+                        connection.execute(
+                            "DELETE FROM assignments WHERE class = ? AND id = ?",
+                            (self.class_key, record["id"])
+                        )
+
+    def save(self, rows, next_id):
+        """
+        Replaces every row of the class in one transaction
+        """
+        with self.database.lock, self.database.connection as connection:
+            self._save_mark(connection, next_id)
+            connection.execute("DELETE FROM assignments WHERE class = ?", (self.class_key,))
+            connection.executemany(
+                "INSERT INTO assignments (status, name, due_date, due_ordinal, due_time, type,"
+                " description, class, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._values(row) + (self.class_key, row[7]) for row in rows)
+            )
+
+    def query(self, status=None, type_of_assignment=None, due_before=None):
+        """
+        Returns the ids of the assignments in the class that match every given
+        filter, using the indexes instead of loading the class
+
+        Args:
+            status (string): only assignments with this status
+            type_of_assignment (string): only assignments of this type
+            due_before (date): only assignments due before this date
+
+        Returns:
+            list: the matching ids ordered by due date
+        """
+        sql = "SELECT id FROM assignments WHERE class = ?"
+        params = [self.class_key]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if type_of_assignment is not None:
+            sql += " AND type = ?"
+            params.append(type_of_assignment)
+        if due_before is not None:
+            sql += " AND due_ordinal < ?"
+            params.append(due_before.toordinal())
+        sql += " ORDER BY due_ordinal IS NULL, due_ordinal, due_time"
+        with self.database.lock:
+            return [row[0] for row in self.database.connection.execute(sql, params)]
+
+
+def open_storage(file_name):
+    """
+    Returns the storage for a class file. SQLite is used when
+    ASSIGNMENT_TRACKER_STORAGE is set to sqlite, or when it is not set and
+    the database exists (see migrate_to_sqlite), otherwise the csv file is used
+    """
+    backend = os.environ.get("ASSIGNMENT_TRACKER_STORAGE")
+    if backend is None:
+        backend = "sqlite" if os.path.exists(resource_path(DATABASE_NAME)) else "csv"
+    if backend == "sqlite":
+        return SqliteStorage(os.path.splitext(file_name)[0])
+    return CsvStorage(file_name)
+
+
+def migrate_to_sqlite(file_names):
+    """
+    Copies the classes stored in the given csv files (with their journals
+    replayed) into the SQLite database, replacing what it held for them
+
+    Args:
+        file_names (list): the class files to migrate (ex: class1.csv)
+    """
+    database = open_database()
+    for file_name in file_names:
+        cls = Cls(file_name, file_name, storage=CsvStorage(file_name))
+        rows = [cls.store.to_row(row) for row in cls.store.live_rows()]
+        SqliteStorage(os.path.splitext(file_name)[0], database).save(rows, cls.next_id)
+
+
+class SaveWriter:
+    """
+    A background thread that writes changed classes to their storage.
+    Changes only mark a Cls dirty; the thread then waits SAVE_DELAY seconds
+    so that a burst of changes to a class is written with one flush
+    """
+    def __init__(self, delay=SAVE_DELAY):
+        self.delay = delay
+        self._dirty = {}
+        self._writing = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def mark_dirty(self, cls):
+        """
+        Schedules the given Cls to be flushed
+        """
+        with self._condition:
+            self._dirty[cls] = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SaveWriter", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._dirty:
+                    self._condition.wait()
+            time.sleep(self.delay)
+            with self._condition:
+                dirty = list(self._dirty)
+                self._dirty.clear()
+                self._writing = True
+            try:
+                self._flush_all(dirty)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _flush_all(self, classes):
+        for cls in classes:
+            try:
+                cls.flush()
+            except Exception:
+                traceback.print_exc()
+
+    def flush(self):
+        """
+        Writes every dirty class right away on the calling thread, used when
+        the app closes
+        """
+        with self._condition:
+            dirty = list(self._dirty)
+            self._dirty.clear()
+        self._flush_all(dirty)
+        self.wait()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until every change marked so far has been written
+
+        Returns:
+            bool: False if the timeout ran out first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._dirty and not self._writing, timeout)
+
+
+writer = SaveWriter()
+atexit.register(writer.flush)
+
+
+COMPLETE = STATUSES.code("Complete")
+
+
+class Agenda:
+    """
+    Every incomplete assignment with a due date across the loaded classes,
+    kept in one list sorted by (due date, due time, class file, id). Classes
+    update it as assignments are added, edited and removed, so the next
+    assignments due are found with a binary search and a slice rather than
+    by sorting every class again
+    """
+    def __init__(self):
+        self.keys = []
+        self.key_of = {}
+        self.classes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(cls, store, row):
+        ordinal = store.due_ordinals[row]
+        if ordinal <= 0 or store.status_codes[row] == COMPLETE:
+            return None
+        return ordinal, parse_due_time(TIMES.values[store.time_codes[row]]), cls.file_name, store.ids[row]
+
+    def _discard(self, entry):
+        key = self.key_of.pop(entry, None)
+        if key is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def add_class(self, cls, store):
+        """
+        Adds every assignment of a class that has just been loaded
+        """
+        with self._lock:
+            if cls.file_name in self.classes:
+                self.keys = [key for key in self.keys if key[2] != cls.file_name]
+                self.key_of = {entry: key for entry, key in self.key_of.items() if entry[0] != cls.file_name}
+            self.classes[cls.file_name] = cls
+            for row in store.live_rows():
+                key = self._key(cls, store, row)
+                if key is not None:
+                    self.key_of[cls.file_name, key[3]] = key
+                    self.keys.append(key)
+            self.keys.sort()
+
+    def update(self, cls, store, row):
+        """
+        Files an assignment again after it was added or edited
+        """
+        with self._lock:
+            self._discard((cls.file_name, store.ids[row]))
+            key = self._key(cls, store, row)
+            if key is not None:
+                self.key_of[cls.file_name, key[3]] = key
+                bisect.insort(self.keys, key)
+
+    def discard(self, cls, assignment_id):
+        """
+        Drops an assignment that was removed from its class
+        """
+        with self._lock:
+            self._discard((cls.file_name, assignment_id))
+
+    def top(self, count, since=0):
+        """
+        Returns the next assignments due as (Cls, Assignment) pairs
+
+        Args:
+            count (int): the most assignments to return
+            since (int): skip assignments due before this date ordinal
+        """
+        with self._lock:
+            start = bisect.bisect_left(self.keys, (since,))
+            keys = self.keys[start:start + count]
+        return self._assignments(keys)
+
+    def overdue(self, count, before):
+        """
+        Returns the assignments due most recently before a date as (Cls,
+        Assignment) pairs, oldest first, so old overdue assignments can't
+        crowd out the ones coming up
+
+        Args:
+            count (int): the most assignments to return
+            before (int): the date ordinal they were due before, usually today
+        """
+        with self._lock:
+            end = bisect.bisect_left(self.keys, (before,))
+            keys = self.keys[max(0, end - count):end]
+        return self._assignments(keys)
+
+    def _assignments(self, keys):
+        return [(self.classes[file_name], self.classes[file_name].get(assignment_id))
+                for _, _, file_name, assignment_id in keys]
+
+
+agenda = Agenda()
+
+
+class Reminders:
+    """
+    A min-heap of the due times of the incomplete assignments across the
+    loaded classes that are not due yet, so the next one due is at the top.
+    An edited or removed assignment's old entry is left in the heap and
+    skipped when it reaches the top, instead of searching the heap for it
+    """
+    def __init__(self):
+        self.heap = []
+        self.due_of = {}
+        self.classes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _due(store, row, now):
+        """
+        Returns when an assignment is due as (date ordinal, minutes), or None
+        if it has no due date, is complete or was due by now
+        """
+        ordinal = store.due_ordinals[row]
+        if ordinal <= 0 or ordinal < now[0] or store.status_codes[row] == COMPLETE:
+            return None
+        due = ordinal, parse_due_time(TIMES.values[store.time_codes[row]])
+        return due if due > now else None
+
+    @staticmethod
+    def _now(now=None):
+        now = now or datetime.now()
+        return now.toordinal(), now.hour * 60 + now.minute
+
+    def _top(self):
+        while self.heap and self.due_of.get(self.heap[0][1:]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def add_class(self, cls, store):
+        """
+        Adds every assignment of a class that has just been loaded
+        """
+        now = self._now()
+        with self._lock:
+            if cls.file_name in self.classes:
+                self.due_of = {entry: due for entry, due in self.due_of.items() if entry[0] != cls.file_name}
+                self.heap = [item for item in self.heap if item[1] != cls.file_name]
+            self.classes[cls.file_name] = cls
+            for row in store.live_rows():
+                due = self._due(store, row, now)
+                if due is not None:
+                    entry = cls.file_name, store.ids[row]
+                    self.due_of[entry] = due
+                    self.heap.append((due, *entry))
+            heapq.heapify(self.heap)
+
+    def update(self, cls, store, row):
+        """
+        Files an assignment again after it was added or edited
+        """
+        entry = cls.file_name, store.ids[row]
+        due = self._due(store, row, self._now())
+        with self._lock:
+            if due is None:
+                self.due_of.pop(entry, None)
+            elif self.due_of.get(entry) != due:
+                self.due_of[entry] = due
+                heapq.heappush(self.heap, (due, *entry))
+                if len(self.heap) > 2 * len(self.due_of) + LOAD_BATCH:
+                    self.heap = [item for item in self.heap if self.due_of.get(item[1:]) == item[0]]
+                    heapq.heapify(self.heap)
+
+    def discard(self, cls, assignment_id):
+        """
+        Drops an assignment that was removed from its class
+        """
+        with self._lock:
+            self.due_of.pop((cls.file_name, assignment_id), None)
+
+    def next_due(self):
+        """
+        Returns the datetime the next assignment is due, or None
+        """
+        with self._lock:
+            top = self._top()
+        if top is None:
+            return None
+        (ordinal, minutes), _, _ = top
+        return datetime.fromordinal(ordinal) + timedelta(minutes=minutes)
+
+    def pop_due(self, now=None):
+        """
+        Removes and returns the assignments due by now as (Cls, Assignment)
+        pairs, so each one is only reminded of once
+
+        Args:
+            now (datetime): the current time, datetime.now() by default
+        """
+        now = self._now(now)
+        due = []
+        with self._lock:
+            while (top := self._top()) is not None and top[0] <= now:
+                heapq.heappop(self.heap)
+                del self.due_of[top[1:]]
+                due.append(top[1:])
+        return [(self.classes[file_name], self.classes[file_name].get(assignment_id))
+                for file_name, assignment_id in due]
+
+
+reminders = Reminders()
+
+
+class SearchIndex:
+    """
+    An inverted index from every word in the name, description and type of
+    an assignment to the assignments using it, across the loaded classes.
+    The words are also kept in a sorted list, so the words starting with a
+    prefix are found with a binary search. A class is indexed on a
+    background thread after it is loaded: its words are found without
+    holding the lock and then merged in, so a search from the Tk thread
+    only waits for the merge, never for a whole class to be tokenized
+    """
+    def __init__(self):
+        self.postings = {}
+        self.words = []
+        self.words_of = {}
+        self.waiting = {}
+        # file name -> ids added, edited or removed while the class is indexed
+        self.building = {}
+        self.indexed = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @staticmethod
+    def tokens(text):
+        """
+        Returns the lowercase words in text
+        """
+        return frozenset(WORD.findall(text.lower()))
+
+    def _row_words(self, store, row):
+        return self.tokens(f"{store.names[row]} {store.descriptions[row]} {TYPES.values[store.type_codes[row]]}")
+
+    def _add(self, entry, words, new_words):
+        self.words_of[entry] = words
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = set()
+                new_words.append(word)
+            posting.add(entry)
+
+    def _discard(self, entry):
+        for word in self.words_of.pop(entry, ()):
+            posting = self.postings[word]
+            posting.discard(entry)
+            if not posting:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.waiting:
+                    self._condition.wait()
+                file_name = next(iter(self.waiting))
+                store = self.waiting.pop(file_name)
+                changed = self.building[file_name] = set()
+            try:
+                words_of = {store.ids[row]: self._row_words(store, row) for row in store.live_rows()}
+            except Exception:
+                traceback.print_exc()
+                words_of = None
+            with self._condition:
+                if self.building.get(file_name) is not changed:
+                    # the class was loaded again meanwhile and is queued anew
+                    continue
+                del self.building[file_name]
+                if words_of is not None:
+                    self._merge(file_name, store, words_of, changed)
+                self._condition.notify_all()
+
+    def _merge(self, file_name, store, words_of, changed):
+        for assignment_id in changed:
+            row = store.row_of.get(assignment_id)
+            if row is None:
+                words_of.pop(assignment_id, None)
+            else:
+                words_of[assignment_id] = self._row_words(store, row)
+        new_words = []
+        for assignment_id, words in words_of.items():
+            self._add((file_name, assignment_id), words, new_words)
+        if new_words:
+            self.words = sorted(self.postings)
+        self.indexed.add(file_name)
+
+    def add_class(self, cls, store):
+        """
+        Forgets the words of a class that has just been loaded and queues it
+        to be indexed again on the background thread
+        """
+        with self._condition:
+            if cls.file_name in self.indexed:
+                for entry in [entry for entry in self.words_of if entry[0] == cls.file_name]:
+                    self._discard(entry)
+                self.indexed.discard(cls.file_name)
+            self.building.pop(cls.file_name, None)
+            self.waiting[cls.file_name] = store
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SearchIndex", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def update(self, cls, store, row):
+        """
+        Indexes an assignment again after it was added or edited
+        """
+        file_name = cls.file_name
+        if file_name not in self.indexed and file_name not in self.building:
+            return
+        entry = (file_name, store.ids[row])
+        words = self._row_words(store, row)
+        with self._condition:
+            if file_name in self.building:
+                self.building[file_name].add(entry[1])
+                return
+            if file_name not in self.indexed or self.words_of.get(entry) == words:
+                return
+            self._discard(entry)
+            new_words = []
+            self._add(entry, words, new_words)
+            for word in new_words:
+                bisect.insort(self.words, word)
+
+    def discard(self, cls, assignment_id):
+        """
+        Drops an assignment that was removed from its class
+        """
+        with self._condition:
+            if cls.file_name in self.building:
+                self.building[cls.file_name].add(assignment_id)
+            elif cls.file_name in self.indexed:
+                self._discard((cls.file_name, assignment_id))
+
+    def pending(self):
+        """
+        Returns whether some loaded class is not indexed yet, so a search
+        may still miss its assignments
+        """
+        with self._condition:
+            return bool(self.waiting or self.building)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until every class loaded so far has been indexed
+
+        Returns:
+            bool: False if the timeout ran out first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self.waiting and not self.building, timeout)
+
+    def search(self, text, wait=True):
+        """
+        Finds the assignments that have a word starting with each word of
+        text
+
+        Args:
+            text (string): what was typed in the search box
+            wait (bool): whether to wait for the classes that are still
+                being indexed; if not, they are left out (see pending())
+
+        Returns:
+            set: (class file name, id) for every match
+        """
+        prefixes = sorted(self.tokens(text), key=len, reverse=True)
+        if not prefixes:
+            return set()
+        if wait:
+            self.wait()
+        with self._condition:
+            # the longest prefix usually matches the fewest words, so the
+            # others only have to be checked against its matches
+            start = bisect.bisect_left(self.words, prefixes[0])
+            end = bisect.bisect_left(self.words, prefixes[0] + "\U0010ffff", start)
+            found = set().union(*(self.postings[word] for word in self.words[start:end]))
+            for prefix in prefixes[1:]:
+                found = {entry for entry in found
+                         if any(word.startswith(prefix) for word in self.words_of[entry])}
+        return found
+
+
+search_index = SearchIndex()
+
+
+def due_sort_key(store, row):
+    ordinal = store.due_ordinals[row]
+    return ordinal <= 0, ordinal, parse_due_time(TIMES.values[store.time_codes[row]])
+
+
+SORT_KEYS = {
+    "status": lambda store, row: store.status_codes[row],
+    "name": lambda store, row: store.names[row].casefold(),
+    "due_date": due_sort_key,
+    "due_time": lambda store, row: parse_due_time(TIMES.values[store.time_codes[row]]),
+    "type": lambda store, row: TYPES.values[store.type_codes[row]].casefold(),
+    "days until due": lambda store, row: (store.due_ordinals[row] <= 0, store.due_ordinals[row]),
+    "description": lambda store, row: store.descriptions[row].casefold(),
+}
+
+
+class SortOrders:
+    """
+    The order of each class's assignments by each table column, built the
+    first time the class is sorted by that column. Sort keys come from
+    SORT_KEYS and are computed once per assignment, so due dates are
+    compared as dates and blank ones go last. An added or edited assignment
+    is moved to its new place with a binary search instead of sorting again
+    """
+    def __init__(self):
+        self.orders = {}
+        self.keys = {}
+        self._lock = threading.Lock()
+
+    def _order(self, cls, store, column):
+        entry = (cls.file_name, column)
+        if entry not in self.orders:
+            get_key = SORT_KEYS[column]
+            keys = {store.ids[row]: (get_key(store, row), store.ids[row]) for row in store.live_rows()}
+            self.keys[entry] = keys
+            self.orders[entry] = sorted(keys.values())
+        return self.orders[entry]
+
+    def sorted_ids(self, cls, column):
+        """
+        Returns the ids of a class's assignments sorted by the given column
+        """
+        store = cls.store
+        with self._lock:
+            return [assignment_id for _, assignment_id in self._order(cls, store, column)]
+
+    def sort_key(self, cls, column, assignment_id):
+        """
+        Returns the key an assignment is sorted by for the given column
+        """
+        store = cls.store
+        with self._lock:
+            self._order(cls, store, column)
+            return self.keys[cls.file_name, column][assignment_id]
+
+    def add_class(self, cls, store):
+        """
+        Forgets the orders of a class that has just been loaded
+        """
+        with self._lock:
+            for column in SORT_KEYS:
+                self.orders.pop((cls.file_name, column), None)
+                self.keys.pop((cls.file_name, column), None)
+
+    def update(self, cls, store, row):
+        """
+        Moves an assignment that was added or edited in every order built for its class
+        """
+        assignment_id = store.ids[row]
+        with self._lock:
+            for column, get_key in SORT_KEYS.items():
+                order = self.orders.get((cls.file_name, column))
+                if order is None:
+                    continue
+                keys = self.keys[cls.file_name, column]
+                old = keys.get(assignment_id)
+                if old is not None:
+                    del order[bisect.bisect_left(order, old)]
+                keys[assignment_id] = (get_key(store, row), assignment_id)
+                bisect.insort(order, keys[assignment_id])
+
+    def discard(self, cls, assignment_id):
+        """
+        Drops an assignment that was removed from its class
+        """
+        with self._lock:
+            for column in SORT_KEYS:
+                keys = self.keys.get((cls.file_name, column))
+                if keys is not None and assignment_id in keys:
+                    order = self.orders[cls.file_name, column]
+                    del order[bisect.bisect_left(order, keys.pop(assignment_id))]
+
+
+sort_orders = SortOrders()
+
+
+class RowFilters:
+    """
+    Bitmap indexes over the rows of each class: an int for every status and
+    type with bit n set when row n has it, one for the rows that are not
+    removed and one for the rows due before today, with the due times of
+    the rows due today. They are built the first time a class is filtered
+    and then patched a bit at a time as assignments change, so applying a
+    filter is a few bit operations
+    """
+    def __init__(self):
+        self.bitmaps = {}
+        self._lock = threading.Lock()
+
+    def _bitmaps(self, cls, store):
+        bitmaps = self.bitmaps.get(cls.file_name)
+        if bitmaps is None:
+            bitmaps = self.bitmaps[cls.file_name] = {
+                "alive": to_bitmap(store.alive),
+                "status": {code: to_bitmap(column_flags(store.status_codes, code))
+                           for code in set(store.status_codes)},
+                "type": {code: to_bitmap(column_flags(store.type_codes, code)) for code in set(store.type_codes)},
+                "overdue": (0, 0, {}),
+            }
+        return bitmaps
+
+    @staticmethod
+    def _overdue(bitmaps, store, now):
+        """
+        Returns the bitmap of the rows past due at the datetime now, by the
+        same rule as past_due(): due before today, or today at a time that
+        has passed
+        """
+        today = now.toordinal()
+        day, before, due_today = bitmaps["overdue"]
+        if day != today:
+            if numpy is not None:
+                ordinals = numpy.frombuffer(store.due_ordinals, dtype=numpy.int32)
+                before = to_bitmap((ordinals > 0) & (ordinals < today))
+                rows = numpy.flatnonzero(ordinals == today).tolist()
+            else:
+                before = to_bitmap(bytes(0 < ordinal < today for ordinal in store.due_ordinals))
+                rows = [row for row, ordinal in enumerate(store.due_ordinals) if ordinal == today]
+            due_today = {row: parse_due_time(TIMES.values[store.time_codes[row]]) for row in rows}
+            bitmaps["overdue"] = (today, before, due_today)
+        overdue = before
+        for row, minutes in due_today.items():
+            if past_due(today, minutes, now):
+                overdue |= 1 << row
+        return overdue
+
+    @staticmethod
+    def _any(bitmaps, codes):
+        selected = 0
+        for code in codes:
+            selected |= bitmaps.get(code, 0)
+        return selected
+
+    def rows(self, cls, statuses=None, types=None, overdue=False, now=None):
+        """
+        Finds the assignments of a class that pass the filters, which are
+        combined with AND while the values given for each one are combined with OR
+
+        Args:
+            cls (Cls): the class to filter
+            statuses (list): the statuses to keep, or None for any
+            types (list): the types of assignment to keep, or None for any
+            overdue (bool): only keep assignments that are past due and not complete
+            now (datetime): the time overdue is checked at, datetime.now() by default
+
+        Returns:
+            int: a bitmap of the rows to show, see bitmap_flags()
+        """
+        store = cls.store
+        with self._lock:
+            bitmaps = self._bitmaps(cls, store)
+            selected = bitmaps["alive"]
+            if statuses is not None:
+                selected &= self._any(bitmaps["status"], (STATUSES.codes.get(status) for status in statuses))
+            if types is not None:
+                selected &= self._any(bitmaps["type"], (TYPES.codes.get(type_name) for type_name in types))
+            if overdue:
+                selected &= self._overdue(bitmaps, store, now or datetime.now())
+                selected &= ~bitmaps["status"].get(COMPLETE, 0)
+        return selected
+
+    def add_class(self, cls, store):
+        """
+        Forgets the bitmaps of a class that has just been loaded
+        """
+        with self._lock:
+            self.bitmaps.pop(cls.file_name, None)
+
+    def update(self, cls, store, row):
+        """
+        Sets the bits of an assignment that was added or edited
+        """
+        bit = 1 << row
+        with self._lock:
+            bitmaps = self.bitmaps.get(cls.file_name)
+            if bitmaps is None:
+                return
+            bitmaps["alive"] |= bit
+            for group, code in (("status", store.status_codes[row]), ("type", store.type_codes[row])):
+                for other in bitmaps[group]:
+                    if other != code:
+                        bitmaps[group][other] &= ~bit
+                bitmaps[group][code] = bitmaps[group].get(code, 0) | bit
+            day, before, due_today = bitmaps["overdue"]
+            ordinal = store.due_ordinals[row]
+            before = before | bit if 0 < ordinal < day else before & ~bit
+            due_today.pop(row, None)
+            if ordinal == day:
+                due_today[row] = parse_due_time(TIMES.values[store.time_codes[row]])
+            bitmaps["overdue"] = (day, before, due_today)
+
+    def discard(self, cls, assignment_id):
+        """
+        Clears the bit of an assignment that is being removed from its class
+        """
+        store = cls.store
+        with self._lock:
+            bitmaps = self.bitmaps.get(cls.file_name)
+            if bitmaps is not None:
+                bitmaps["alive"] &= ~(1 << store.row_of[assignment_id])
+
+
+row_filters = RowFilters()
+indexes = [agenda, reminders, search_index, sort_orders, row_filters]
+
+
+class Archive:
+    """
+    The archived assignments of a class, as a gzip compressed csv next to
+    its file (ex: class1.csv.archive.gz). Each archiving appends a gzip
+    member to the end of the file, and the file is only read when the
+    history of the class is shown or assignments are restored from it
+    """
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def _read(self):
+        try:
+            with open(resource_path(self.file_name), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return b""
+
+    def _write(self, data):
+        atomic_write(resource_path(self.file_name), lambda file: file.write(data))
+
+    @staticmethod
+    def _compress(rows):
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        return gzip.compress(buffer.getvalue().encode(), ARCHIVE_COMPRESSION)
+
+    @staticmethod
+    def _decompress(data):
+        """
+        Decompresses the gzip members in data one at a time. A member torn by
+        a crash while it was being appended fails its checksum and is
+        skipped, and reading carries on from the next member
+        """
+        view = memoryview(data)
+        parts = []
+        start = 0
+        while 0 <= start < len(data):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                text = decompressor.decompress(view[start:])
+            except zlib.error:
+                text = None
+            if text is not None and decompressor.eof:
+                parts.append(text)
+                start = len(data) - len(decompressor.unused_data)
+            else:
+                start = data.find(GZIP_MAGIC, start + 1)
+        return b"".join(parts)
+
+    @staticmethod
+    def key(row):
+        """
+        Returns what identifies an archived row. Days until due (column 5)
+        is left out, it changes every day
+        """
+        return tuple(str(field) for field in row[:5] + row[6:])
+
+    def load(self, pending=()):
+        """
+        Reads every archived row. A row that is in the archive twice (archived
+        again after a crash before its removal from the class was written)
+        is only returned once
+
+        Args:
+            pending (list): rows archived since that are not written yet
+
+        Returns:
+            list: the archived rows as csv fields, oldest first
+        """
+        rows = {}
+        text = self._decompress(self._read()).decode()
+        for row in itertools.chain(csv.reader(io.StringIO(text, newline='')), pending):
+            if len(row) in (7, 8):
+                rows.setdefault(self.key(row), row)
+        return list(rows.values())
+
+    def append(self, rows):
+        """
+        Adds rows to the end of the archive as a new gzip member, without
+        reading what is already there
+        """
+        with open(resource_path(self.file_name), 'ab') as file:
+            file.write(self._compress(rows))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def remove(self, keys):
+        """
+        Rewrites the archive without the rows with the given keys
+        """
+        self.save([row for row in self.load() if self.key(row) not in keys])
+
+    def save(self, rows):
+        """
+        Replaces the whole archive with the given rows
+        """
+        self._write(self._compress(rows) if rows else b"")
+
+
+class Cls: 
+    def __init__(self, name, file_name, storage=None):
+        """Creates an instance of the Cls class
+        The assignments are not read until they are first needed, when ensure_loaded() calls open_class()
+
+        Args:
+            name (string): the string name of the class to be used as a label
+            file_name (_type_): the filename associated with the class (ex: class1.csv)
+            storage (CsvStorage or SqliteStorage): where the class is stored, picked by open_storage() if not given
+        """
+        self.name = name
+        self.file_name = file_name
+        self.storage = storage or open_storage(file_name)
+        self.history = Archive(file_name + ARCHIVE_SUFFIX)
+        self._store = None
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._pending = []
+        # rows archived and keys of rows restored that are not written yet
+        self._archiving = []
+        self._restoring = []
+
+    @property
+    def store(self):
+        """
+        Returns the AssignmentStore of the class, loading it first if needed
+        """
+        if self._store is None:
+            self.ensure_loaded()
+        return self._store
+
+    @property
+    def loaded(self):
+        return self._store is not None
+
+    @property
+    def next_id(self):
+        """
+        Returns the id the next assignment added will get. Ids only go up,
+        so an id is never used again after its assignment is removed
+        """
+        self.ensure_loaded()
+        return self._next_id
+
+    def ensure_loaded(self):
+        """
+        Loads the class if it has not been loaded yet. Safe to call from the
+        prefetch thread while the Tk thread is also asking for the class
+        """
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self.open_class()
+
+    @timed("open_class")
+    def open_class(self):
+        """
+        Loads the rows of the class from its storage into the
+        AssignmentStore, then replays the journal on top of them. A csv is
+        read from its binary cache when the cache is fresh, and the cache is
+        written when it is not
+        """
+        store = self.storage.load_cached()
+        if store is None:
+            store = AssignmentStore()
+            for item in self.storage.load():
+                if len(item) in (7, 8):
+                    store.append_row(item)
+            self.storage.save_cached(store)
+
+        # rows from before ids were stored get the same ids on every load
+        # until the next compaction writes them out
+        self._next_id = max(store.row_of, default=0) + 1
+        for row, assignment_id in enumerate(store.ids):
+            if not assignment_id:
+                store.set_id(row, self._next_id)
+                self._next_id += 1
+
+        for record in self.storage.replay():
+            self._apply(store, record)
+        # ids of assignments removed since are not given out again
+        self._next_id = max(self._next_id, self.storage.next_id)
+        for index in indexes:
+            index.add_class(self, store)
+        self._store = store
+
+    @property
+    def assignment_list(self):
+        """
+        Returns the assignments of the class in the order they were added
+        """
+        return [Assignment.view(self.store, row) for row in self.store.live_rows()]
+
+    def get(self, assignment_id):
+        """
+        Returns the assignment with the given id
+        :param assignment_id: the id as an int or as the string used for Treeview rows
+        """
+        return Assignment.view(self.store, self.store.row_of[int(assignment_id)])
+
+    def _apply(self, store, record):
+        """
+        Applies a single journal record to the store being loaded
+        """
+        match record["op"]:
+            case "add":
+                row = store.append_row(record["row"])
+                self._next_id = max(self._next_id, store.ids[row] + 1)
+            case "edit":
+                store.update_row(store.row_of[record["id"]], record["row"])
+            case "delete":
+                store.kill(store.row_of[record["id"]])
+
+    def _record(self, record):
+        """
+        Queues a single change and marks the class dirty, so the SaveWriter
+        thread writes it together with any other changes made around it
+        """
+        self._pending.append(record)
+        writer.mark_dirty(self)
+
+    @timed("flush")
+    def flush(self):
+        """
+        Writes the changes queued since the last flush in one batch, or
+        rewrites the class when the storage is not journaled. A journal that
+        has grown too large is compacted afterwards. Archived rows are
+        written to the archive before their removal from the class, and
+        restored rows are taken out of the archive after they are added back
+        """
+        with self._write_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+                next_id = self._next_id
+                archiving, restoring = list(self._archiving), list(self._restoring)
+            self._write_archived(archiving)
+            if not self.storage.journaled:
+                if records:
+                    self._save()
+            else:
+                if records:
+                    self.storage.record_many(records, next_id)
+                if self.storage.needs_compaction():
+                    self._save()
+            self._write_restored(restoring)
+
+    def _write_archived(self, batches):
+        if batches:
+            self.history.append([row for rows in batches for row in rows])
+            with self._lock:
+                del self._archiving[:len(batches)]
+
+    def _write_restored(self, batches):
+        if batches:
+            self.history.remove(set().union(*batches))
+            with self._lock:
+                del self._restoring[:len(batches)]
+
+    def add(self, assignment):
+        """
+        Adds the given assignment object to the Cls, after which the
+        assignment is a view onto the Cls's AssignmentStore
+        :param assignment: an Assignment object
+        """
+        with self._lock:
+            row = self.store.append_row(assignment.to_row()[:7])
+            self.store.set_id(row, self._next_id)
+            self._next_id += 1
+            assignment.store = self.store
+            assignment.row = row
+            for index in indexes:
+                index.update(self, self.store, row)
+            self._record({"op": "add", "row": assignment.to_row()})
+
+    def add_many(self, rows):
+        """
+        Adds many assignments at once. The indexes are rebuilt once at the
+        end and the SaveWriter writes all of them in a single flush
+        :param rows: csv fields for each assignment, can be a generator
+        :return: the number of assignments added
+        """
+        added = 0
+        with self._lock:
+            store = self.store
+            try:
+                for fields in rows:
+                    row = store.append_row(list(fields[:7]))
+                    store.set_id(row, self._next_id)
+                    self._next_id += 1
+                    self._pending.append({"op": "add", "row": store.to_row(row)})
+                    added += 1
+            finally:
+                # rows added before an error in the generator are kept
+                if added:
+                    for index in indexes:
+                        index.add_class(self, store)
+                    writer.mark_dirty(self)
+        return added
+
+    def edit(self, assignment, *fields):
+        """
+        Updates the given assignment with new field values
+        :param assignment: an Assignment object in this Cls
+        :param fields: status, name, due_date, due_time, type_of_assignment, days_until_due, description
+        """
+        with self._lock:
+            self.store.update_row(assignment.row, fields)
+            for index in indexes:
+                index.update(self, self.store, assignment.row)
+            self._record({"op": "edit", "id": assignment.id, "row": assignment.to_row()})
+
+    def remove(self, assignment):
+        """
+        Removes the given assignment from the Cls
+        :param assignment: an Assignment object in this Cls
+        """
+        with self._lock:
+            for index in indexes:
+                index.discard(self, assignment.id)
+            self.store.kill(assignment.row)
+            self._record({"op": "delete", "id": assignment.id})
+
+    def archive(self, assignments):
+        """
+        Moves assignments into the archive of the class. The SaveWriter
+        writes them to the archive first, then their removal from the class,
+        and compacts the class so the csv only holds the rest
+        :param assignments: Assignment objects in this Cls
+        :return: the number of assignments archived
+        """
+        with self._lock:
+            store = self.store
+            rows = [assignment.row for assignment in assignments]
+            if not rows:
+                return 0
+            self._archiving.append([store.to_row(row) for row in rows])
+            for row in rows:
+                assignment_id = store.ids[row]
+                for index in indexes:
+                    index.discard(self, assignment_id)
+                store.kill(row)
+                self._pending.append({"op": "delete", "id": assignment_id})
+            self.storage.request_compaction()
+            writer.mark_dirty(self)
+        return len(rows)
+
+    def archive_done(self, past_due_days=None):
+        """
+        Archives the complete assignments, and also the incomplete ones due
+        more than past_due_days days ago when it is given
+        :return: the number of assignments archived
+        """
+        store = self.store
+        before = today_ordinal() - past_due_days if past_due_days is not None else 0
+        return self.archive([
+            Assignment.view(store, row) for row in store.live_rows()
+            if store.status_codes[row] == COMPLETE or 0 < store.due_ordinals[row] < before
+        ])
+
+    def archived(self):
+        """
+        Reads the archive of the class, which is not kept in memory, along
+        with the archiving and restoring that is not written yet
+
+        Returns:
+            list: the archived assignments, oldest first, as Assignment
+            objects over an AssignmentStore of their own
+        """
+        with self._lock:
+            archiving = [row for rows in self._archiving for row in rows]
+            restored = set().union(*self._restoring)
+        store = AssignmentStore()
+        for fields in self.history.load(archiving):
+            if Archive.key(fields) not in restored:
+                store.append_row(fields)
+        return [Assignment.view(store, row) for row in store.live_rows()]
+
+    def restore(self, assignments):
+        """
+        Moves archived assignments back into the class with new ids. The
+        SaveWriter writes them to the class before it takes them out of the
+        archive
+        :param assignments: Assignment objects from archived()
+        :return: the number of assignments restored
+        """
+        rows = [assignment.to_row() for assignment in assignments]
+        with self._lock:
+            restored = self.add_many(row[:7] for row in rows)
+            self._restoring.append({Archive.key(row) for row in rows})
+        return restored
+    
+    @timed("save_class")
+    def save_class(self):
+        """
+        Saves the whole class to its storage. For a journaled csv this is
+        the compaction
+        """
+        with self._write_lock:
+            with self._lock:
+                restoring = list(self._restoring)
+            self._save()
+            self._write_restored(restoring)
+
+    def _save(self):
+        with self._lock:
+            records, self._pending = self._pending, []
+            next_id = self._next_id
+            archiving = list(self._archiving)
+            store = self.store.compacted()
+        # the copy leaves out the rows being archived, so they are written to
+        # the archive first
+        self._write_archived(archiving)
+        if records and self.storage.journaled:
+            self.storage.record_many(records, next_id)
+        self.storage.save([store.to_row(row) for row in range(len(store.ids))], next_id)
+        # the copy holds exactly the rows just written, so the next start
+        # can read the cache instead of parsing the csv
+        self.storage.save_cached(store)
+
+
+class Assignment:
+    """
+    A single assignment, as a lightweight view onto one row of an
+    AssignmentStore. An assignment created on its own gets a private
+    one-row store until it is added to a Cls
+    """
+    __slots__ = ("store", "row")
+
+    def __init__(self, status, name, due_date, due_time, type_of_assignment, days_until_due, description,
+                 assignment_id=""):
+        self.store = AssignmentStore()
+        self.row = self.store.append_row(
+            [status, name, due_date, due_time, type_of_assignment, days_until_due, description, assignment_id]
+        )
+
+    @classmethod
+    def view(cls, store, row):
+        """
+        Returns an Assignment for an existing row of a store
+        """
+        assignment = cls.__new__(cls)
+        assignment.store = store
+        assignment.row = row
+        return assignment
+
+    @property
+    def id(self):
+        return self.store.ids[self.row] or None
+
+    @property
+    def status(self):
+        return STATUSES.values[self.store.status_codes[self.row]]
+
+    @property
+    def name(self):
+        return self.store.names[self.row]
+
+    @property
+    def due_date_string(self):
+        return self.store.due_date_string(self.row)
+
+    @property
+    def due_date(self):
+        ordinal = self.store.due_ordinals[self.row]
+        return date.fromordinal(ordinal) if ordinal else None
+
+    @property
+    def due_time(self):
+        return TIMES.values[self.store.time_codes[self.row]]
+
+    @property
+    def type_of_assignment(self):
+        return TYPES.values[self.store.type_codes[self.row]]
+
+    @property
+    def description(self):
+        return self.store.descriptions[self.row]
+
+    @property
+    def days_until_due(self):
+        return self.compute_days_until_due()
+
+    @property
+    def complete(self):
+        return self.status == "Complete"
+
+    def to_row(self):
+        """
+        Returns the assignment as a list of fields in csv column order
+        """
+        return self.store.to_row(self.row)
+
+    def compute_days_until_due(self):
+        return self.store.days_until_due(self.row)
+
+
+class ClassRegistry:
+    """
+    Every class, in the order they are listed, with a dict to find one by
+    name. The classes are listed in a small index file (CLASS_INDEX, one
+    name and file name per row), so starting up only reads the index, and
+    a class's own file is not read until the class is first used
+    """
+    def __init__(self, index_file=CLASS_INDEX):
+        self.index_file = index_file
+        self.classes = []
+        self.by_name = {}
+
+    def __iter__(self):
+        return iter(list(self.classes))
+
+    def __len__(self):
+        return len(self.classes)
+
+    def _append(self, cls):
+        self.classes.append(cls)
+        self.by_name.setdefault(cls.name, cls)
+
+    def load(self, default_names=()):
+        """
+        Reads the index. When there isn't one yet, class1.csv onwards are
+        listed under default_names and the index is written
+
+        Args:
+            default_names (list): the names of the classes from setup.csv
+        """
+        try:
+            with open(resource_path(self.index_file), newline='') as file:
+                for row in csv.reader(file):
+                    if len(row) >= 2 and row[0].strip() != "":
+                        self._append(Cls(row[0], row[1]))
+        except FileNotFoundError:
+            for number, name in enumerate(default_names, start=1):
+                self._append(Cls(name, f"class{number}.csv"))
+            self.save()
+
+    def save(self):
+        """
+        Writes the index with atomic_write()
+        """
+        rows = [[cls.name, cls.file_name] for cls in self.classes]
+        atomic_write(resource_path(self.index_file), lambda file: csv.writer(file).writerows(rows), text=True)
+
+    def get(self, name):
+        """
+        Returns the class with the given name, or None
+        """
+        return self.by_name.get(name)
+
+    def names(self):
+        return [cls.name for cls in self.classes]
+
+    def add(self, name):
+        """
+        Adds a new, empty class stored in the first free classN.csv
+
+        Raises:
+            ValueError: if there is already a class with that name
+        """
+        if name in self.by_name:
+            raise ValueError(f"There is already a class named {name}")
+        cls = self._new_class(name)
+        self._append(cls)
+        self.save()
+        return cls
+
+    def _new_class(self, name):
+        used = {cls.file_name for cls in self.classes}
+        number = len(self.classes) + 1
+        while f"class{number}.csv" in used or os.path.exists(resource_path(f"class{number}.csv")):
+            number += 1
+        return Cls(name, f"class{number}.csv")
+
+    def set_names(self, names, new_name=""):
+        """
+        Renames every class at once, names being in the same order as the
+        classes, and adds a class called new_name when one is given. Every
+        name is checked before anything is changed or saved
+
+        Raises:
+            ValueError: if two classes would have the same name
+        """
+        if len(set(names)) != len(names):
+            raise ValueError("Two classes can't have the same name")
+        if new_name in names:
+            raise ValueError(f"There is already a class named {new_name}")
+        for cls, name in zip(self.classes, names):
+            cls.name = name
+        self.by_name = {cls.name: cls for cls in self.classes}
+        if new_name:
+            self._append(self._new_class(new_name))
+        self.save()
+
+
+SETTINGS_FILE = "setup.csv"
+DEFAULT_CLASS_NAMES = ["Class 1", "Class 2", "Class 3", "Class 4", "Class 5", "Class 6", "Class 7"]
+DEFAULT_THEME = "green"
+
+
+class Settings:
+    """
+    Everything in setup.csv, read once at startup and then changed in
+    memory. The first row is the class names followed by the theme, as it
+    always was, and each row after it is one setting: a scope (window, or
+    the file name of a class), a key and its values. Changes mark the
+    settings dirty and the SaveWriter writes them, so a burst of changes is
+    one write.
+
+    The class index (CLASS_INDEX) is where the class names are kept. The
+    names in the first row are only read to make the index when there is
+    none yet, and once open_classes() has set classes they are written from
+    it, for older versions that read them from setup.csv
+    """
+    def __init__(self, file_name=SETTINGS_FILE):
+        self.file_name = file_name
+        self.names = []
+        self.classes = None
+        self.theme = DEFAULT_THEME
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Reads the settings, creating the file with the default class names
+        and theme if it does not exist
+        """
+        try:
+            with open(resource_path(self.file_name), 'r', newline='') as file:
+                rows = [row for row in csv.reader(file) if row]
+        except FileNotFoundError:
+            self.names = list(DEFAULT_CLASS_NAMES)
+            self.flush()
+            return
+        if rows:
+            self.theme = rows[0][-1]
+            self.names = [name for name in rows[0][:-1] if name.strip() != ""]
+        for row in rows[1:]:
+            if len(row) >= 2:
+                self.values[row[0], row[1]] = row[2:]
+
+    def get(self, scope, key, default=None):
+        """
+        Returns the values of a setting as a list of strings, or default if it is not set
+        """
+        return self.values.get((scope, key), default)
+
+    def set(self, scope, key, values):
+        with self._lock:
+            self.values[scope, key] = [str(value) for value in values]
+        writer.mark_dirty(self)
+
+    def set_theme(self, theme):
+        self.theme = theme
+        writer.mark_dirty(self)
+
+    def classes_changed(self):
+        """
+        Writes the first row again after classes are renamed or added
+        """
+        writer.mark_dirty(self)
+
+    def flush(self):
+        """
+        Writes every setting with atomic_write()
+        """
+        names = self.names if self.classes is None else self.classes.names()
+        with self._lock:
+            rows = [names + [self.theme]]
+            rows.extend([scope, key] + values for (scope, key), values in self.values.items())
+        atomic_write(resource_path(self.file_name), lambda file: csv.writer(file).writerows(rows), text=True)
+
+
+def open_classes(settings=None):
+    """
+    Returns the ClassRegistry of every class. When there is no class index
+    yet, it is made from the class names in the settings. From then on the
+    settings write their class names from the registry. None of the
+    classes are loaded until they are used
+    """
+    classes = ClassRegistry()
+    if os.path.exists(resource_path(CLASS_INDEX)):
+        classes.load()
+    else:
+        if settings is None:
+            settings = Settings()
+            settings.load()
+        classes.load(settings.names)
+    if not len(classes):
+        classes.add("Class 1")
+    if settings is not None:
+        settings.classes = classes
+    return classes
+
+
+IMPORT_COLUMNS = {
+    "status": 0,
+    "name": 1, "assignment": 1, "title": 1,
+    "due date": 2, "date": 2, "due": 2,
+    "due time": 3, "time": 3,
+    "type": 4, "category": 4,
+    "description": 6, "notes": 6, "details": 6,
+}
+ICS_STATUSES = {"NEEDS-ACTION": "Not Started", "IN-PROCESS": "In Progress", "COMPLETED": "Complete"}
+
+
+def batched(iterable, size):
+    """
+    Yields lists of up to size items from iterable
+    """
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+
+def import_columns(header):
+    """
+    Matches the header of a syllabus CSV to the class csv fields
+
+    Returns:
+        dict: the position in the header of each field, or None when the
+        file has no header and is in the same order as a class csv
+    """
+    columns = {}
+    for position, title in enumerate(header):
+        field = IMPORT_COLUMNS.get(title.strip().lower())
+        if field is not None:
+            columns.setdefault(field, position)
+    return columns if 1 in columns else None
+
+
+def parse_csv_batch(rows, columns=None):
+    """
+    Turns rows of a syllabus CSV into class csv fields. Dates written as
+    YYYY-MM-DD are changed to M/D/YYYY
+    """
+    parsed = []
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            fields = (row + [""] * 7)[:7]
+        else:
+            fields = [""] * 7
+            for field, position in columns.items():
+                if position < len(row):
+                    fields[field] = row[position].strip()
+        if "-" in fields[2]:
+            try:
+                fields[2] = format_due_date(date.fromisoformat(fields[2].strip()))
+            except ValueError:
+                pass
+        fields[5] = ""
+        parsed.append(fields)
+    return parsed
+
+
+def ics_components(lines):
+    """
+    Yields the content lines of each VEVENT and VTODO in an iCalendar file,
+    with folded lines joined back together
+    """
+    def unfolded():
+        previous = None
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if line[:1] in (" ", "\t") and previous is not None:
+                previous += line[1:]
+                continue
+            if previous is not None:
+                yield previous
+            previous = line
+        if previous is not None:
+            yield previous
+
+    component = None
+    for line in unfolded():
+        if line in ("BEGIN:VEVENT", "BEGIN:VTODO"):
+            component = []
+        elif line in ("END:VEVENT", "END:VTODO"):
+            if component is not None:
+                yield component
+            component = None
+        elif component is not None:
+            component.append(line)
+
+
+def ics_text(value):
+    return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def ics_due(value):
+    """
+    Reads an iCalendar date or date-time as a due date and due time. Times
+    in UTC are changed to local time, other time zones are read as local
+
+    Returns:
+        tuple: the due date as M/D/YYYY and the due time as H:MM AM/PM (blank
+        for a date without a time), or value unchanged when it can't be read
+    """
+    value = value.strip()
+    try:
+        if "T" not in value:
+            return format_due_date(datetime.strptime(value[:8], "%Y%m%d")), ""
+        moment = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        return value, ""
+    if value.endswith("Z"):
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    suffix = "AM" if moment.hour < 12 else "PM"
+    return format_due_date(moment), f"{moment.hour % 12 or 12}:{moment.minute:02d} {suffix}"
+
+
+def parse_ics_batch(components):
+    """
+    Turns VEVENT and VTODO components from ics_components() into class csv fields
+    """
+    parsed = []
+    for lines in components:
+        properties = {}
+        for line in lines:
+            name, _, value = line.partition(":")
+            properties.setdefault(name.split(";")[0].upper(), value)
+        due_date, due_time = ics_due(properties.get("DUE") or properties.get("DTSTART", ""))
+        parsed.append([
+            ICS_STATUSES.get(properties.get("STATUS", "").strip().upper(), ""),
+            ics_text(properties.get("SUMMARY", "")).strip(),
+            due_date,
+            due_time,
+            ics_text(properties.get("CATEGORIES", "")).split(",")[0].strip(),
+            "",
+            ics_text(properties.get("DESCRIPTION", "")).strip(),
+        ])
+    return parsed
+
+
+def pool_map(function, batches, workers):
+    """
+    Like map(), but runs function on a process pool. At most two batches per
+    worker are waiting at a time, so a large file is never read all at once
+    """
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.submit(function, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parse_import(file_name, workers=None):
+    """
+    Yields the assignments in a syllabus CSV or an iCalendar (.ics) file as
+    class csv fields, reading the file IMPORT_BATCH records at a time
+
+    Args:
+        file_name (string): the file to import
+        workers (int): processes used to parse the batches, by default one
+            per CPU for files over IMPORT_POOL_BYTES and none otherwise
+    """
+    with open(file_name, newline='', encoding="utf-8-sig") as file:
+        if file_name.lower().endswith(".ics"):
+            parse = parse_ics_batch
+            batches = batched(ics_components(file), IMPORT_BATCH)
+        else:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            columns = import_columns(header)
+            if columns is None:
+                reader = itertools.chain([header], reader)
+            parse = functools.partial(parse_csv_batch, columns=columns)
+            batches = batched(reader, IMPORT_BATCH)
+
+        if workers is None:
+            workers = (os.cpu_count() or 1) if os.path.getsize(file_name) > IMPORT_POOL_BYTES else 1
+        results = map(parse, batches) if workers <= 1 else pool_map(parse, batches, workers)
+        for rows in results:
+            yield from rows
+
+
+def validate_import(rows, counts):
+    """
+    Passes on the rows that have a name and a blank or valid due date,
+    counting the others in counts
+    """
+    for fields in rows:
+        if not fields[1].strip():
+            counts["no name"] += 1
+        elif not valid_date(fields[2]):
+            counts["invalid date"] += 1
+        else:
+            yield fields
+
+
+def dedupe_import(rows, cls, counts):
+    """
+    Passes on the rows that don't have the same name and due date as an
+    assignment already in the class or earlier in the import
+    """
+    store = cls.store
+    seen = {(store.names[row].casefold(), store.due_ordinals[row]) for row in store.live_rows()}
+    for fields in rows:
+        key = (fields[1].casefold(), read_due_date(fields[2])[0])
+        if key in seen:
+            counts["duplicate"] += 1
+        else:
+            seen.add(key)
+            yield fields
+
+
+def import_assignments(cls, file_name, workers=None):
+    """
+    Imports a syllabus CSV or an iCalendar file into a class. The file is
+    streamed through parse_import(), validate_import() and dedupe_import()
+    into Cls.add_many(), so it is written once at the end
+
+    Returns:
+        Counter: how many assignments were added and how many were skipped, by reason
+    """
+    counts = collections.Counter()
+    rows = parse_import(file_name, workers)
+    rows = validate_import(rows, counts)
+    rows = dedupe_import(rows, cls, counts)
+    counts["added"] = cls.add_many(rows)
+    return counts
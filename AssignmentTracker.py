@@ -1,151 +1,191 @@
+import bisect
 import csv
-import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import date
+import functools
+import itertools
+import multiprocessing
 import os
 import sys
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from tkinter import font as tkfont
+from datetime import datetime, timedelta
+
+from AssignmentCore import (
+    AGENDA_OVERDUE, AGENDA_SIZE, CLASS_INDEX, COMPLETE, DEFAULT_THEME, PREFETCH_LIMIT, STATUS_LIST, TYPES, Assignment,
+    ClassRegistry, InvalidDateError, SearchIndex, Settings, agenda, bitmap_flags, import_assignments, instruments,
+    migrate_to_sqlite, open_classes, parse_date, parse_due_time, past_due, reminders, resource_path, row_filters,
+    search_index, sort_orders, timed, writer,
+)
 
+VIRTUAL_THRESHOLD = 2000
+VIRTUAL_BUFFER = 50
+FRAME_MS = 16
+ALL_TYPES = "All Types"
+DUE_SOON_DAYS = 3
+# the same in every theme, since a tint of a light theme like white or
+# yellow can't be told apart from an ordinary row
+DUE_SOON_COLOR = "#FFD966"
+# the reminder timer is re-armed at least hourly, which keeps within the
+# longest delay Tk allows and catches up after the computer has been asleep
+REMINDER_MAX_DELAY = 60 * 60 * 1000
+LOAD_POLL_MS = 100
+THEME_COLORS = {
+    "white": ("#FFFFFF", "#000000", "#000000FF"),
+    "pink": ("#FF6EBE", "#000000", "#FF249C"),
+    "yellow": ("#FFFCCC", "#000000", "#FFF894"),
+    "green": ("#00BB77", "#000000", "#01754B"),
+    "blue": ("#56C4FF", "#000000", "#19A0EA"),
+    "purple": ("#BC8FF7", "#000000", "#9C52FC"),
+}
+
+
+@timed("on_select")
+def on_select(event):
+    """
+    Updates class names based on the changes made
+    """
+    global current_class
+    current_class = classes.get(event.widget.get()) or current_class
 
-def resource_path(filename):
-    """_summary_
+    restore_layout()
+    show_current_class()
+    reminder_timer.arm()
+    window.update_idletasks()
 
-    Args:
-        filename (string): the name of the file
 
-    Returns:
-        string:the path to the file
+@timed("show_current_class")
+def show_current_class():
+    """
+    Loads the current class into the table, keeping only the assignments
+    that match the search box when something has been typed in it
     """
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, filename)
-    return filename
+    text = search_text.get()
+    searching = bool(SearchIndex.tokens(text))
+    filters = current_filters()
+    filtering = filters["statuses"] is not None or filters["types"] is not None or filters["overdue"]
+    column = current_table.sort_column
+    current_table.sort_key = None if column is None else functools.partial(
+        sort_orders.sort_key, current_class, column)
+
+    if not searching and not filtering and column is None:
+        current_table.load(current_class.assignment_list)
+        search_label.configure(text="")
+        return
 
+    store = current_class.store
+    flags = store.alive
+    if filtering:
+        flags = bitmap_flags(row_filters.rows(current_class, **filters), len(store.alive))
+
+    if searching:
+        found = search_index.search(text, wait=False)
+        rows = sorted(store.row_of[assignment_id] for file_name, assignment_id in found
+                      if file_name == current_class.file_name)
+        ids = [store.ids[row] for row in rows if flags[row]]
+        if column is not None:
+            ids.sort(key=current_table.sort_key, reverse=current_table.sort_reverse)
+        message = f"{len(ids)} found, {len(found) - len(rows)} in other classes"
+        unloaded = [cls_obj for cls_obj in classes if not cls_obj.loaded]
+        if unloaded or search_index.pending():
+            message += ", loading more"
+            if search_loader[0] is None:
+                search_loader[0] = load_in_background(unloaded, on_search_loaded, name="Search", indexed=True)
+        search_label.configure(text=message)
+    else:
+        if column is None:
+            ids = [store.ids[row] for row in itertools.compress(range(len(flags)), flags)]
+        else:
+            ids = sort_orders.sorted_ids(current_class, column)
+            if current_table.sort_reverse:
+                ids.reverse()
+            if filtering:
+                ids = [assignment_id for assignment_id in ids if flags[store.row_of[assignment_id]]]
+        search_label.configure(text="")
 
-class Cls: 
-    def __init__(self, name, file_name):
-        """Creates an instance of the Cls class
-        Along with the given parameters, it also creates an empty assignment list, then calls open_class() to fill it
+    current_table.load([Assignment.view(store, store.row_of[assignment_id]) for assignment_id in ids])
 
-        Args:
-            name (string): the string name of the class to be used as a label
-            file_name (_type_): the filename associated with the class (ex: class1.csv)
-        """
-        self.name = name
-        self.file_name = file_name
-        self.assignment_list = []
-        self.open_class()
 
-    def open_class(self):
-        """
-        Opens the file name for the class and reads the csv file
-        into a list of Assignment objects
-        """
-        try:
-            with open(resource_path(self.file_name), 'r', newline='') as file:
-                for item in csv.reader(file):
-                    if len(item) == 7:
-                        self.assignment_list.append(Assignment(*item))
-        except FileNotFoundError:
-            open(resource_path(self.file_name), 'w').close()
-            self.assignment_list = []
+def on_search(*args):
+    show_current_class()
 
-    def add(self, assignment):
-        """
-        Adds the given assignment object to the list of
-        Assignment objects for the Cls
-        :param assignment: an Assignment object
-        """
-        self.assignment_list.append(assignment)
-    
-    def save_class(self):
-        """
-        Saves the currently opened class to the associated file
-        """
-        with open(resource_path(self.file_name), 'w', newline='') as curr_file:
-            csv_writer = csv.writer(curr_file)
-            for assignment in self.assignment_list:
-                csv_writer.writerow([
-                    assignment.status,
-                    assignment.name,
-                    assignment.due_date_string,
-                    assignment.due_time,
-                    assignment.type_of_assignment,
-                    assignment.days_until_due,
-                    assignment.description
-                ])
-
-
-class Assignment:
-    def __init__(self, status, name, due_date, due_time, type_of_assignment, days_until_due, description):
-        self.status = status if status.strip() != "" else "Not Started"
-        self.name = name
-        self.due_date_string = due_date
-        self.due_date = self.parse_date(due_date)
-        self.due_time = due_time
-        self.type_of_assignment = type_of_assignment
-        self.description = description
-        self.days_until_due = self.compute_days_until_due()
-        self.complete = (self.status == "Complete")
-
-    def parse_date(self, s):
-        try:
-            parts = s.split("/")
-            if len(parts) != 3:
-                return None
-            month = int(parts[0])
-            day = int(parts[1])
-            year = int(parts[2])
-            return date(year, month, day)
-        except:
-            return None
-
-    def compute_days_until_due(self):
-        if self.due_date is None:
-            return ""
-        return (self.due_date - date.today()).days
 
+def on_search_loaded():
+    """
+    Searches again once the classes that were not loaded or indexed when the
+    search started have been loaded and indexed in the background
+    """
+    search_loader[0] = None
+    reminder_timer.arm()
+    if SearchIndex.tokens(search_text.get()):
+        show_current_class()
 
-def on_select(event):
+
+search_loader = [None]
+
+
+def current_filters():
     """
-    Updates class names based on the changes made
+    Returns the filters chosen in the Filter pop-up, as arguments for row_filters.rows()
     """
-    global current_table_frame, current_class
-    selected = event.widget.get()
+    statuses = [status for status, shown in status_filters.items() if shown.get()]
+    type_name = type_filter.get()
+    return {
+        "statuses": None if len(statuses) == len(status_filters) else statuses,
+        "types": None if type_name == ALL_TYPES else [type_name],
+        "overdue": overdue_filter.get(),
+    }
 
-    if current_table_frame is not None:
-        current_table_frame.destroy()
-        current_table_frame = None
 
-    for cls_obj in [class1, class2, class3, class4, class5, class6, class7]:
-        if cls_obj.name == selected:
-            current_class = cls_obj
-            break
+@timed("filter_assignments")
+def filter_assignments():
+    """
+    Creates the Filter pop-up, where statuses can be hidden and the table
+    limited to one type or to overdue assignments. The table is updated
+    as soon as a filter changes
+    """
+    popup = tk.Toplevel(window)
+    popup.title("Filter")
 
-    current_table_frame = create_assignment_table(frame)
-    current_table_frame.pack(fill=tk.BOTH, expand=True)
-    window.update_idletasks()
+    tk.Label(popup, text="Show:").grid(row=0, column=0, sticky=tk.W)
+    for row, (status, shown) in enumerate(status_filters.items(), start=1):
+        tk.Checkbutton(popup, text=status, variable=shown, command=show_current_class).grid(
+            row=row, column=0, sticky=tk.W)
 
-def valid_date(s):
-    if s.strip() == "":
-        return True
-    try:
-        parts = s.split("/")
-        if len(parts) != 3:
-            return False
-        month = int(parts[0])
-        day = int(parts[1])
-        year = int(parts[2])
-        date(year, month, day)
-        return True
-    except:
-        return False
+    tk.Label(popup, text="Type:").grid(row=4, column=0, sticky=tk.W)
+    type_choice = ttk.Combobox(
+        popup,
+        textvariable=type_filter,
+        state="readonly",
+        values=[ALL_TYPES] + sorted(type_name for type_name in TYPES.values if type_name))
+    type_choice.grid(row=5, column=0, padx=5)
+    type_choice.bind("<<ComboboxSelected>>", on_search)
+
+    tk.Checkbutton(popup, text="Overdue only", variable=overdue_filter, command=show_current_class).grid(
+        row=6, column=0, sticky=tk.W)
+
+    def clear():
+        for shown in status_filters.values():
+            shown.set(True)
+        type_filter.set(ALL_TYPES)
+        overdue_filter.set(False)
+        show_current_class()
+
+    clear_button = tk.Button(popup, text="Clear", command=clear)
+    clear_button.grid(row=7, column=0, pady=10)
 
+
+@timed("add_assignment")
 def add_assignment():
     global current_class
 
+    @timed("add_assignment.save")
     def sync(event=None):
-        global current_table_frame
-        if current_table_frame is not None:
-            current_table_frame.destroy()
+        try:
+            parse_date(date_entry.get())
+        except InvalidDateError as error:
+            messagebox.showerror("showerror", str(error))
+            return
 
         temp_assignment = Assignment(
             "Not Started",
@@ -157,9 +197,8 @@ def add_assignment():
             desc_entry.get()
         )
         current_class.add(temp_assignment)
-        current_class.save_class()
-
-        current_table_frame = create_assignment_table(frame)
+        current_table.insert(temp_assignment)
+        reminder_timer.arm()
         popup.destroy()
 
     if current_class is None:
@@ -220,78 +259,159 @@ def add_assignment():
         entry.bind("<Return>", focus_next)
 
 
+@timed("delete_assignment")
 def delete_assignment():
     """
     Deletes selected Assignment(s) from the currently selected
     Cls and updates the table
     """
-    global current_table_frame
-
-    tree = current_table_frame.winfo_children()[0]
-    selected_items = tree.selection()
+    selected_items = current_table.selection()
 
     if not selected_items:
         messagebox.showerror("showerror", "No assignment selected to delete")
         return
 
     for item_id in selected_items:
-        values = tree.item(item_id, "values")
-        for assignment in current_class.assignment_list:
-            if (
-                assignment.status == values[0]
-                and assignment.name == values[1]
-                and assignment.due_date_string == values[2]
-                and assignment.due_time == values[3]
-                and assignment.type_of_assignment == values[4]
-                and str(assignment.days_until_due) == values[5]
-                and assignment.description == values[6]
-            ):
-                current_class.assignment_list.remove(assignment)
-                break
-
-    current_class.save_class()
-
-    current_table_frame.destroy()
-    current_table_frame = create_assignment_table(frame)
+        current_class.remove(current_class.get(item_id))
 
+    current_table.remove(selected_items)
+    reminder_timer.arm()
 
-def create_assignment_table(root):
+
+class RenderScheduler:
     """
-    Creates the assignment table
+    Coalesces work that is asked for many times in a row, like the
+    <Configure> events sent while a window is being dragged, into at most
+    one run per frame (FRAME_MS). Only the latest request for each key is run
     """
-    table = ttk.Frame(root)
-    table.pack(fill=tk.BOTH, expand=True)
+    def __init__(self, widget):
+        self.widget = widget
+        self.pending = {}
+        self._job = None
 
-    columns = ("status", "name", "due_date", "due_time", "type", "days until due", "description")
-    tree = ttk.Treeview(
-        table,
-        columns=columns,
-        show="headings",
-        height=10,
-        style="Custom.Treeview"
-    )
-    tree.grid(row=0, column=0, sticky="nsew")
+    def request(self, key, function, *args):
+        """
+        Runs function(*args) on the next frame, replacing whatever was waiting under key
+        """
+        self.pending[key] = (function, args)
+        if self._job is None:
+            self._job = self.widget.after(FRAME_MS, self._run)
 
-    scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=tree.yview)
-    scrollbar.grid(row=0, column=1, sticky="ns")
-    tree.configure(yscroll=scrollbar.set)
+    def _run(self):
+        self._job = None
+        pending, self.pending = self.pending, {}
+        for function, args in pending.values():
+            function(*args)
 
-    table.columnconfigure(0, weight=1)
-    table.rowconfigure(0, weight=1)
 
-    headers = ["Status", "Name", "Due Date", "Due Time", "Type", "Days Until Due", "Description"]
-    for col, text in zip(columns, headers):
-        tree.heading(col, text=text)
+class ReminderTimer:
+    """
+    Keeps a single timer armed for the next assignment due in the reminders
+    heap. arm() is called after anything that can change the next due time
+    and only replaces the timer when that time changed, so nothing runs
+    between deadlines. When the timer fires, on_due is called with the
+    (Cls, Assignment) pairs that have just come due
+    """
+    def __init__(self, widget, on_due):
+        self.widget = widget
+        self.on_due = on_due
+        self.due = None
+        self._job = None
 
+    def arm(self):
+        """
+        Points the timer at the next due time, if it is not already
+        """
+        due = reminders.next_due()
+        if due == self.due:
+            return
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self.due = due
+        if due is not None:
+            delay = int((due - datetime.now()).total_seconds() * 1000) + 1
+            self._job = self.widget.after(max(0, min(delay, REMINDER_MAX_DELAY)), self._fire)
+
+    def _fire(self):
+        self._job = None
+        self.due = None
+        due = reminders.pop_due()
+        if due:
+            self.on_due(due)
+        self.arm()
+
+
+# wraps sort keys so that they compare the other way round, for bisecting a reversed order
+descending = functools.cmp_to_key(lambda a, b: (a < b) - (a > b))
+
+
+class AssignmentTable:
+    """
+    The table of assignments shown in the main window. It is created once
+    and kept up to date by inserting, updating and removing single rows.
+    Classes with more than VIRTUAL_THRESHOLD assignments are shown in
+    virtual mode, where only the rows around the visible ones are in the Treeview
+    """
+    columns = ("status", "name", "due_date", "due_time", "type", "days until due", "description")
+    headers = ["Status", "Name", "Due Date", "Due Time", "Type", "Days Until Due", "Description"]
     base_widths = [120, 120, 100, 80, 120, 150, 250]
-    total_base = sum(base_widths)
-    proportions = [w / total_base for w in base_widths]
 
-    for col, width in zip(columns, base_widths):
-        tree.column(col, width=width, minwidth=50, stretch=True)
+    def __init__(self, root):
+        self.frame = ttk.Frame(root)
+        self.frame.pack(fill=tk.BOTH, expand=True)
 
-    for assignment in current_class.assignment_list:
-        tree.insert("", tk.END, values=(
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=self.columns,
+            show="headings",
+            height=10,
+            style="Custom.Treeview"
+        )
+        self.tree.grid(row=0, column=0, sticky="nsew")
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.tree.configure(yscroll=self.on_tree_scroll)
+
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(0, weight=1)
+
+        for col, text in zip(self.columns, self.headers):
+            self.tree.heading(col, text=text)
+
+        for col, width in zip(self.columns, self.base_widths):
+            self.tree.column(col, width=width, minwidth=50, stretch=True)
+
+        self.rows = []
+        self.virtual = False
+        self.start = 0
+        self.end = 0
+        self.offset = 0
+        self.visible_rows = 10
+        self.selected = {}
+        self._recenter_job = None
+        self.sort_column = None
+        self.sort_reverse = False
+        self.sort_key = None
+        self.keys = None
+        self.key_of = {}
+        self.width = None
+        self.set_widths(self.base_widths)
+        self.resizing = False
+        self.scheduler = RenderScheduler(self.tree)
+
+        self.tree.bind("<Configure>", self.on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.tree.bind("<ButtonPress-1>", self.on_press, add="+")
+        self.tree.bind("<ButtonRelease-1>", self.on_release, add="+")
+
+    @staticmethod
+    def values(assignment):
+        """
+        Returns the values shown in the table for the given assignment
+        """
+        return (
             assignment.status,
             assignment.name,
             assignment.due_date_string,
@@ -299,18 +419,464 @@ def create_assignment_table(root):
             assignment.type_of_assignment,
             assignment.days_until_due,
             assignment.description
-        ))
+        )
+
+    def load(self, assignments):
+        """
+        Replaces every row in the table, used when switching classes
+        """
+        self.rows = list(assignments)
+        self.keys = None
+        self.selected = {}
+        self.offset = 0
+        self.virtual = len(self.rows) > VIRTUAL_THRESHOLD
+        if self.virtual:
+            self.materialize()
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        self._insert_rows(self.rows)
+
+    def insert(self, assignment):
+        """
+        Adds a row for the given assignment at the end of the table
+        """
+        self.rows.append(assignment)
+        if not self.virtual and len(self.rows) > VIRTUAL_THRESHOLD:
+            self.load(self.rows)
+        elif not self.virtual:
+            self._insert_rows([assignment])
+        elif self.end >= len(self.rows) - 1:
+            self.materialize()
+        else:
+            self.update_scrollbar()
+        if self.sort_key is not None:
+            self.place(assignment)
+
+    def update(self, assignment):
+        """
+        Refreshes the row of the given assignment after it was edited
+        """
+        if self.tree.exists(str(assignment.id)):
+            self.tree.item(str(assignment.id), values=self.values(assignment), tags=row_tag(assignment, datetime.now()))
+        if self.sort_key is not None:
+            self.place(assignment)
+
+    def _key(self, assignment_id):
+        key = self.sort_key(assignment_id)
+        return descending(key) if self.sort_reverse else key
+
+    def place(self, assignment):
+        """
+        Moves the row of an assignment that was just added or edited to
+        where sort_key puts it. The key each row was placed with is kept in
+        keys, in the order of the rows, so both the row's old place and its
+        new one are found with a binary search. keys is built on the first
+        call after the rows are loaded, which has to look at every row anyway
+        """
+        if not self.rows:
+            return
+        if self.keys is None:
+            self.keys = [self._key(row.id) for row in self.rows]
+            self.key_of = {row.id: key for row, key in zip(self.rows, self.keys)}
+            index = next((i for i, row in enumerate(self.rows) if row.id == assignment.id), None)
+        elif assignment.id in self.key_of:
+            index = bisect.bisect_left(self.keys, self.key_of[assignment.id])
+        else:
+            # insert() has just added it at the end
+            index = len(self.rows) - 1
+        if index is None or self.rows[index].id != assignment.id:
+            return
+        row = self.rows.pop(index)
+        if len(self.keys) > len(self.rows):
+            del self.keys[index]
+
+        key = self.key_of[assignment.id] = self._key(assignment.id)
+        low = bisect.bisect_left(self.keys, key)
+        self.rows.insert(low, row)
+        self.keys.insert(low, key)
+
+        if self.virtual:
+            self.materialize()
+        elif self.tree.exists(str(assignment.id)):
+            self.tree.move(str(assignment.id), "", low)
+
+    def show_sort(self):
+        """
+        Marks the heading of the column the table is sorted by with an arrow
+        """
+        for col, text in zip(self.columns, self.headers):
+            if col == self.sort_column:
+                text += " \u25bc" if self.sort_reverse else " \u25b2"
+            self.tree.heading(col, text=text)
+
+    def remove(self, assignment_ids):
+        """
+        Removes the rows with the given assignment ids
+        """
+        removed = {int(assignment_id) for assignment_id in assignment_ids}
+        self.rows = [assignment for assignment in self.rows if assignment.id not in removed]
+        self.keys = None
+        if not self.virtual:
+            self.tree.delete(*[str(assignment_id) for assignment_id in removed])
+            return
+
+        for assignment_id in removed:
+            self.selected.pop(assignment_id, None)
+        self.materialize()
+
+    def refresh_days(self):
+        """
+        Rewrites the days until due and the highlighting of the rows in the
+        Treeview, which in virtual mode are only the ones around the visible rows
+        """
+        now = datetime.now()
+        shown = self.rows[self.start:self.end] if self.virtual else self.rows
+        for assignment in shown:
+            self.tree.item(str(assignment.id), values=self.values(assignment), tags=row_tag(assignment, now))
+
+    def selection(self):
+        """
+        Returns the ids of the selected rows, including rows scrolled out of
+        the Treeview in virtual mode
+        """
+        if not self.virtual:
+            return self.tree.selection()
+        return tuple(str(assignment_id) for assignment_id in self.selected)
+
+    def _insert_rows(self, assignments):
+        """
+        Inserts rows at the end of the Treeview, each tagged by row_tag()
+        """
+        now = datetime.now()
+        for assignment in assignments:
+            self.tree.insert("", tk.END, iid=str(assignment.id), values=self.values(assignment),
+                             tags=row_tag(assignment, now))
+
+    def materialize(self):
+        """
+        Fills the Treeview with the rows around the current offset and
+        scrolls it so the row at the offset is at the top
+        """
+        self.offset = max(0, min(self.offset, len(self.rows) - self.visible_rows))
+        self.start = max(0, self.offset - VIRTUAL_BUFFER)
+        self.end = min(len(self.rows), self.offset + self.visible_rows + VIRTUAL_BUFFER)
+
+        self.tree.delete(*self.tree.get_children())
+        window_rows = self.rows[self.start:self.end]
+        self._insert_rows(window_rows)
+        self.tree.selection_set([str(a.id) for a in window_rows if a.id in self.selected])
+
+        if window_rows:
+            self.tree.yview_moveto((self.offset - self.start) / len(window_rows))
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        """
+        Sets the scrollbar in virtual mode so that it is proportional to all rows
+        """
+        total = max(len(self.rows), 1)
+        self.scrollbar.set(self.offset / total, min(self.offset + self.visible_rows, total) / total)
+
+    def scroll_to(self, offset):
+        """
+        Shows the rows starting at the given offset, only rebuilding the
+        Treeview when the offset is outside of the rows it already holds
+        """
+        self.offset = max(0, min(offset, len(self.rows) - self.visible_rows))
+        if self.start <= self.offset and self.offset + self.visible_rows <= self.end:
+            self.tree.yview_moveto((self.offset - self.start) / (self.end - self.start))
+        else:
+            self.materialize()
+
+    def yview(self, *args):
+        """
+        Handles the scrollbar, which covers every row instead of only the
+        ones in the Treeview when in virtual mode
+        """
+        if not self.virtual:
+            return self.tree.yview(*args)
+
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_tree_scroll(self, first, last):
+        """
+        Called by the Treeview when it scrolls itself (mouse wheel, arrow keys).
+        In virtual mode the position is translated to the whole list and the
+        window of rows is moved once the view gets close to its edge
+        """
+        if not self.virtual:
+            self.scrollbar.set(first, last)
+            return
+
+        size = self.end - self.start
+        if size == 0:
+            self.scrollbar.set(0, 1)
+            return
+        first, last = float(first), float(last)
+        self.offset = self.start + round(first * size)
+        self.visible_rows = max(1, round((last - first) * size))
+        total = len(self.rows)
+        self.scrollbar.set((self.start + first * size) / total, (self.start + last * size) / total)
+
+        near_top = self.start > 0 and self.offset - self.start < VIRTUAL_BUFFER // 2
+        near_bottom = self.end < total and self.end - self.offset - self.visible_rows < VIRTUAL_BUFFER // 2
+        if (near_top or near_bottom) and self._recenter_job is None:
+            self._recenter_job = self.tree.after_idle(self._recenter)
+
+    def _recenter(self):
+        self._recenter_job = None
+        self.materialize()
+
+    def on_tree_select(self, event=None):
+        """
+        Keeps track of the selected ids in virtual mode so the selection
+        survives rows being scrolled out of the Treeview
+        """
+        if not self.virtual:
+            return
+        for assignment in self.rows[self.start:self.end]:
+            self.selected.pop(assignment.id, None)
+        for item_id in self.tree.selection():
+            self.selected[int(item_id)] = True
+
+    def on_configure(self, event):
+        self.scheduler.request("columns", self.resize_columns, event.width)
+
+    def on_press(self, event):
+        self.resizing = self.tree.identify_region(event.x, event.y) == "separator"
+
+    def on_release(self, event):
+        """
+        Keeps the widths the user dragged the columns to as the proportions
+        used from now on, and sends <<ColumnsResized>> so they can be saved
+        """
+        if self.resizing:
+            self.resizing = False
+            self.set_widths(self.column_widths())
+            self.tree.event_generate("<<ColumnsResized>>")
 
-    def resize_columns(event):
-        total_width = max(event.width - 18, 400)
-        for col, prop in zip(columns, proportions):
+    def column_widths(self):
+        return [int(self.tree.column(col, "width")) for col in self.columns]
+
+    def set_widths(self, widths):
+        """
+        Sets the share of the table's width each column gets from a list of
+        widths, and lays the columns out again if the table has been drawn
+        """
+        total = sum(widths)
+        self.proportions = [width / total for width in widths]
+        if self.width is not None:
+            width, self.width = self.width, None
+            self.resize_columns(width)
+
+    @timed("resize_columns")
+    def resize_columns(self, width):
+        """
+        Spreads the width of the table over the columns in proportion to
+        proportions, unless the width is the same as last time
+        """
+        if width == self.width:
+            return
+        self.width = width
+        total_width = max(width - 18, 400)
+        for col, prop in zip(self.columns, self.proportions):
             new_width = int(total_width * prop)
-            tree.column(col, width=new_width)
+            self.tree.column(col, width=new_width)
 
-    tree.bind("<Configure>", resize_columns)
+
+@timed("create_assignment_table")
+def create_assignment_table(root):
+    """
+    Creates the assignment table and fills it with the current class
+    """
+    table = AssignmentTable(root)
+    for col in table.columns:
+        table.tree.heading(col, command=functools.partial(sort_by, col))
+    table.tree.bind("<<ColumnsResized>>", save_column_widths)
+    configure_row_tags(table.tree)
+    table.load(current_class.assignment_list)
     return table
 
 
+def save_column_widths(event=None):
+    setup.set(current_class.file_name, "widths", current_table.column_widths())
+
+
+def restore_layout():
+    """
+    Sets the column widths and sort order of the table to the ones saved
+    for the current class, or the defaults if none were saved
+
+    Returns:
+        bool: whether the sort order changed, so the rows have to be loaded again
+    """
+    widths = setup.get(current_class.file_name, "widths", [])
+    if len(widths) != len(current_table.columns) or not all(width.isdigit() and int(width) for width in widths):
+        widths = current_table.base_widths
+    current_table.set_widths([int(width) for width in widths])
+
+    sort = setup.get(current_class.file_name, "sort", [])
+    column, reverse = (sort[0], sort[1:] == ["1"]) if sort and sort[0] in current_table.columns else (None, False)
+    if (column, reverse) == (current_table.sort_column, current_table.sort_reverse):
+        return False
+    current_table.sort_column = column
+    current_table.sort_reverse = reverse
+    current_table.show_sort()
+    return True
+
+
+@timed("sort_by")
+def sort_by(column):
+    """
+    Sorts the table by the clicked column, or reverses the order when it
+    is already sorted by that column
+    """
+    if current_table.sort_column == column:
+        current_table.sort_reverse = not current_table.sort_reverse
+    else:
+        current_table.sort_column = column
+        current_table.sort_reverse = False
+    setup.set(current_class.file_name, "sort", [column, int(current_table.sort_reverse)])
+    current_table.show_sort()
+    show_current_class()
+
+
+@timed("import_file")
+def import_file():
+    """
+    Asks for a syllabus CSV or an iCalendar file and imports it into the
+    current class, then refreshes the table once
+    """
+    file_name = filedialog.askopenfilename(
+        title="Import Assignments",
+        filetypes=[("Syllabus or calendar", "*.csv *.ics"), ("All files", "*.*")]
+    )
+    if not file_name:
+        return
+
+    try:
+        counts = import_assignments(current_class, file_name)
+    except (OSError, UnicodeDecodeError, csv.Error) as error:
+        show_current_class()
+        reminder_timer.arm()
+        messagebox.showerror("showerror", f"Could not import {os.path.basename(file_name)}: {error}")
+        return
+
+    show_current_class()
+    reminder_timer.arm()
+    message = f"Added {counts.pop('added')} assignments to {current_class.name}"
+    if counts:
+        message += " (skipped " + ", ".join(f"{count} {reason}" for reason, count in counts.items()) + ")"
+    messagebox.showinfo("Import", message)
+
+
+@timed("show_agenda")
+def show_agenda():
+    """
+    Opens a popup listing the next assignments due across the loaded
+    classes, after the last few overdue ones. Classes that are not loaded
+    yet are loaded in the background and the list is filled in again
+    """
+    popup = tk.Toplevel(window)
+    popup.title("Agenda")
+
+    columns = ("class", "name", "due_date", "due_time", "days until due")
+    tree = ttk.Treeview(popup, columns=columns, show="headings", style="Custom.Treeview")
+    for column, header in zip(columns, ["Class", "Name", "Due Date", "Due Time", "Days Until Due"]):
+        tree.heading(column, text=header)
+        tree.column(column, width=120)
+    tree.pack(fill=tk.BOTH, expand=True)
+    configure_row_tags(tree)
+
+    def fill():
+        if not popup.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        now = datetime.now()
+        today = now.toordinal()
+        for cls_obj, assignment in agenda.overdue(AGENDA_OVERDUE, today) + agenda.top(AGENDA_SIZE, today):
+            tree.insert("", tk.END, values=(
+                cls_obj.name,
+                assignment.name,
+                assignment.due_date_string,
+                assignment.due_time,
+                assignment.days_until_due
+            ), tags=row_tag(assignment, now))
+
+    fill()
+    unloaded = [cls_obj for cls_obj in classes if not cls_obj.loaded]
+    if unloaded:
+        load_in_background(unloaded, fill, name="Agenda")
+
+
+@timed("show_history")
+def show_history():
+    """
+    Opens a popup listing the archived assignments of the current class,
+    which are only read from its archive now. The completed assignments
+    can be archived, and archived ones restored, from here
+    """
+    popup = tk.Toplevel(window)
+    popup.title(f"History: {current_class.name}")
+
+    columns = ("status", "name", "due_date", "due_time", "type")
+    tree = ttk.Treeview(popup, columns=columns, show="headings", style="Custom.Treeview")
+    for column, header in zip(columns, ["Status", "Name", "Due Date", "Due Time", "Type"]):
+        tree.heading(column, text=header)
+        tree.column(column, width=120)
+    tree.pack(fill=tk.BOTH, expand=True)
+
+    archived = []
+
+    def fill():
+        tree.delete(*tree.get_children())
+        archived[:] = current_class.archived()
+        for number, assignment in enumerate(archived):
+            tree.insert("", tk.END, iid=number, values=(
+                assignment.status,
+                assignment.name,
+                assignment.due_date_string,
+                assignment.due_time,
+                assignment.type_of_assignment
+            ))
+
+    def archive_completed():
+        if current_class.archive_done():
+            show_current_class()
+            reminder_timer.arm()
+            fill()
+
+    def restore():
+        selected = [archived[int(item_id)] for item_id in tree.selection()]
+        if not selected:
+            messagebox.showerror("showerror", "No assignment selected to restore")
+            return
+        current_class.restore(selected)
+        show_current_class()
+        reminder_timer.arm()
+        fill()
+
+    buttons = tk.Frame(popup)
+    buttons.pack(fill=tk.X)
+    for text, command in (("Archive Completed", archive_completed), ("Restore", restore)):
+        tk.Button(
+            buttons,
+            text=text,
+            bg=current_theme[0],
+            fg="black",
+            relief="flat",
+            command=command
+        ).pack(side=tk.LEFT, padx=5, pady=5)
+
+    fill()
+
+
+@timed("settings")
 def settings():
     """
     Creates the setings menu and calls associated
@@ -318,7 +884,7 @@ def settings():
     """
     popup = tk.Toplevel(window)
     popup.title("Settings")
-    popup.geometry("250x150")
+    popup.geometry("250x180")
 
     tk.Label(popup, text="Settings", font=("Arial", 14, "bold")).pack()
 
@@ -342,6 +908,16 @@ def settings():
     )
     theme_button.pack()
 
+    profiler_button = tk.Button(
+        popup,
+        text="Profiler",
+        bg=current_theme[0],
+        fg="black",
+        relief="flat",
+        command=show_profiler
+    )
+    profiler_button.pack()
+
     edit_button = tk.Button(
         popup,
         text="Edit Assignment",
@@ -352,25 +928,93 @@ def settings():
     )
 
 
+def show_profiler():
+    """
+    Creates the Profiler pop-up, which turns the timers on and off, shows
+    the p50 and p99 times of everything timed so far and can run the next
+    call of one action under cProfile
+    """
+    popup = tk.Toplevel(window)
+    popup.title("Profiler")
+
+    enabled = tk.BooleanVar(value=instruments.enabled)
+
+    def toggle():
+        instruments.enabled = enabled.get()
+
+    tk.Checkbutton(popup, text="Record timings", variable=enabled, command=toggle).pack(anchor=tk.W)
+
+    columns = ("name", "calls", "p50", "p99", "total")
+    tree = ttk.Treeview(popup, columns=columns, show="headings", height=12)
+    for column, header in zip(columns, ["Action", "Calls", "p50 (ms)", "p99 (ms)", "Total (ms)"]):
+        tree.heading(column, text=header)
+        tree.column(column, width=180 if column == "name" else 90)
+    tree.pack(fill=tk.BOTH, expand=True)
+
+    controls = tk.Frame(popup)
+    controls.pack(fill=tk.X)
+    profile_text = tk.Text(popup, height=12, width=100)
+    profile_text.pack(fill=tk.BOTH, expand=True)
+
+    def refresh():
+        tree.delete(*tree.get_children())
+        for name, (calls, p50, p99, total) in sorted(instruments.stats().items()):
+            tree.insert("", tk.END, values=(name, calls, f"{p50 * 1000:.2f}", f"{p99 * 1000:.2f}", f"{total * 1000:.1f}"))
+        profile_text.delete("1.0", tk.END)
+        profile_text.insert(tk.END, instruments.last_profile)
+
+    def reset():
+        instruments.reset()
+        refresh()
+
+    def dump():
+        file_name = filedialog.asksaveasfilename(
+            title="Save Timings",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not file_name:
+            return
+        try:
+            instruments.dump(file_name)
+        except OSError as error:
+            messagebox.showerror("showerror", f"Could not save the timings: {error}")
+
+    action = tk.StringVar(value=instruments.names[0])
+    action_choice = ttk.Combobox(controls, textvariable=action, state="readonly", values=sorted(instruments.names))
+
+    def profile_next():
+        enabled.set(True)
+        instruments.enabled = True
+        instruments.profile_next = action.get()
+
+    tk.Button(controls, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5, pady=5)
+    tk.Button(controls, text="Reset", command=reset).pack(side=tk.LEFT, padx=5, pady=5)
+    tk.Button(controls, text="Save to File", command=dump).pack(side=tk.LEFT, padx=5, pady=5)
+    action_choice.pack(side=tk.LEFT, padx=5, pady=5)
+    tk.Button(controls, text="cProfile Next Call", command=profile_next).pack(side=tk.LEFT, padx=5, pady=5)
+
+    refresh()
+
+
+@timed("edit_assignment")
 def edit_assignment():
-    global current_table_frame
-    tree = current_table_frame.winfo_children()[0]
-    selected_items = tree.selection()
+    selected_items = current_table.selection()
 
     if not selected_items:
         messagebox.showerror("showerror", "No assignment selected to edit")
         return
 
-    first_item = selected_items[0]
-    values = tree.item(first_item, "values")
-
     if current_class is None:
         return
 
+    # the class can be switched while the popup is open, so it keeps its own
+    cls = current_class
+    selected = cls.get(selected_items[0])
+
     popup = tk.Toplevel(window)
     popup.title("Edit Assignment")
     
-    STATUS_LIST = ["Not Started", "In Progress", "Complete"]
     status_label = tk.Label(popup, text="Status:")
     status_label.grid(row=1, column=1, sticky=tk.E)
     status_options = tk.StringVar()
@@ -380,73 +1024,68 @@ def edit_assignment():
         style="Custom.TCombobox",
         state="readonly",
         values= STATUS_LIST)
-    status_choice.set(values[0])
+    status_choice.set(selected.status)
     status_choice.grid(row=1,column=2)
     
     assignment_label = tk.Label(popup, text="Assignment:")
     assignment_label.grid(row=2, column=1, sticky=tk.E)
     name_entry = ttk.Entry(popup)
     name_entry.grid(row=2, column=2)
-    name_entry.insert(0, values[1])
+    name_entry.insert(0, selected.name)
     name_entry.focus()
 
     date_label = tk.Label(popup, text="Due Date:")
     date_label.grid(row=3, column=1, sticky=tk.E)
     date_entry = ttk.Entry(popup)
     date_entry.grid(row=3, column=2)
-    date_entry.insert(0, values[2])
+    date_entry.insert(0, selected.due_date_string)
 
     time_label = tk.Label(popup, text="Due Time:")
     time_label.grid(row=4, column=1, sticky=tk.E)
     time_entry = ttk.Entry(popup)
     time_entry.grid(row=4, column=2)
-    time_entry.insert(0, values[3])
+    time_entry.insert(0, selected.due_time)
 
     type_label = tk.Label(popup, text="Type:")
     type_label.grid(row=5, column=1, sticky=tk.E)
     type_entry = ttk.Entry(popup)
     type_entry.grid(row=5, column=2)
-    type_entry.insert(0, values[4])
+    type_entry.insert(0, selected.type_of_assignment)
 
     desc_label = tk.Label(popup, text="Description:")
     desc_label.grid(row=6, column=1, sticky=tk.E)
     desc_entry = ttk.Entry(popup)
     desc_entry.grid(row=6, column=2)
-    desc_entry.insert(0, values[6])
+    desc_entry.insert(0, selected.description)
 
     
+    @timed("edit_assignment.save")
     def sync(event=None):
-        global current_table_frame
+        try:
+            parse_date(date_entry.get())
+        except InvalidDateError as error:
+            messagebox.showerror("showerror", str(error))
+            return
 
-        captured_rows = []
         for item_id in selected_items:
-            captured_rows.append(tree.item(item_id, "values"))
-
-        if current_table_frame is not None:
-            current_table_frame.destroy()
-
-        for row_vals in captured_rows:
-            for assignment in current_class.assignment_list:
-                if (
-                    assignment.status == row_vals[0]
-                    and assignment.name == row_vals[1]
-                    and assignment.due_date_string == row_vals[2]
-                    and assignment.due_time == row_vals[3]
-                    and assignment.type_of_assignment == row_vals[4]
-                    and assignment.description == row_vals[6]
-                ):
-                    assignment.status = status_choice.get()
-                    assignment.name = name_entry.get()
-                    assignment.due_date_string = date_entry.get()
-                    assignment.due_date = assignment.parse_date(assignment.due_date_string)
-                    assignment.due_time = time_entry.get()
-                    assignment.type_of_assignment = type_entry.get()
-                    assignment.description = desc_entry.get()
-                    assignment.days_until_due = assignment.compute_days_until_due()
-                    break
-
-        current_class.save_class()
-        current_table_frame = create_assignment_table(frame)
+            if int(item_id) not in cls.store.row_of:
+                # deleted or archived while the popup was open
+                continue
+            assignment = cls.get(item_id)
+            cls.edit(
+                assignment,
+                status_choice.get(),
+                name_entry.get(),
+                date_entry.get(),
+                time_entry.get(),
+                type_entry.get(),
+                "",
+                desc_entry.get()
+            )
+            if cls is current_class:
+                current_table.update(assignment)
+        reminder_timer.arm()
+
         popup.destroy()
 
 
@@ -476,6 +1115,7 @@ def edit_assignment():
         entry.bind("<Return>", focus_next)
 
 
+@timed("manage_theme")
 def manage_theme():
     """
     Creates popup that lets user select the current theme for the interface
@@ -500,64 +1140,94 @@ def manage_theme():
                 border=5, command=lambda: set_theme("white")).grid(row=2, column=6, pady=2)
 
 
+def tint(color, amount):
+    """
+    Mixes a #RRGGBB color with white, amount being the share of white
+    """
+    red, green, blue = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return "#" + "".join(f"{round(c + (255 - c) * amount):02X}" for c in (red, green, blue))
+
+
+def row_tag(assignment, now):
+    """
+    Returns the tags a row of the table is highlighted with at the datetime
+    now: complete, overdue (past its due date and time and not complete),
+    due_soon (due in DUE_SOON_DAYS days or less) or none
+    """
+    store, row = assignment.store, assignment.row
+    if store.status_codes[row] == COMPLETE:
+        return ("complete",)
+    ordinal = store.due_ordinals[row]
+    if ordinal <= 0:
+        return ()
+    if past_due(ordinal, parse_due_time(assignment.due_time), now):
+        return ("overdue",)
+    if ordinal - now.toordinal() <= DUE_SOON_DAYS:
+        return ("due_soon",)
+    return ()
+
+
+def configure_row_tags(tree):
+    """
+    Sets up the complete, overdue and due_soon row tags of a Treeview. They
+    look the same in every theme, so this is done once when the tree is made
+    """
+    if not strike_font:
+        font = tkfont.nametofont("TkDefaultFont").copy()
+        font.configure(overstrike=True)
+        strike_font.append(font)
+    tree.tag_configure("complete", foreground="#808080", font=strike_font[0])
+    tree.tag_configure("overdue", foreground="#B00020", background=tint("#FF0000", 0.85))
+    tree.tag_configure("due_soon", background=DUE_SOON_COLOR)
+
+
+strike_font = []
+
+
+def theme_styles(theme):
+    """
+    Returns the options of the ttk styles the widgets share, for a theme
+    """
+    bg, fg, border = get_theme_colors(theme)
+    return {
+        "Custom.TCombobox": dict(fieldbackground="#FFFFFF", background=bg, bordercolor=bg, arrowsize=14),
+        "Buttons.TButton": dict(background=bg, foreground=fg, bordercolor=border, highlightbackground=fg,
+                                highlightthickness=5, focusthickness=0, padding=6, relief="solid"),
+        "Custom.Treeview.Heading": dict(background=bg, foreground="black", relief="flat"),
+    }
+
+
+def apply_styles(theme):
+    """
+    Configures the shared ttk styles for a theme, unless it is already
+    applied. The buttons share one style, so none is restyled one by one
+    """
+    if theme == applied_theme[0]:
+        return
+    for name, options in theme_styles(theme).items():
+        style.configure(name, **options)
+    applied_theme[0] = theme
+
+
+applied_theme = [None]
+
+
 def get_theme_colors(theme):
     """
-    Returns list that contains hex codes for the colors within the chosen theme
-    """
-    WHITE = ["#FFFFFF", "#000000", "#000000FF"]
-    PINK = ["#FF6EBE", "#000000", "#FF249C"]
-    YELLOW = ["#FFFCCC", "#000000", "#FFF894"]
-    GREEN = ["#00BB77", "#000000", "#01754B"]
-    BLUE = ["#56C4FF", "#000000", "#19A0EA"]
-    PURPLE = ["#BC8FF7", "#000000", "#9C52FC"]
-    match theme:
-        case "white":
-            return WHITE
-        case "pink":
-            return PINK
-        case "yellow":
-            return YELLOW
-        case "green":
-            return GREEN
-        case "blue":
-            return BLUE
-        case "purple":
-            return PURPLE
+    Returns the background, foreground and border colors of the chosen theme
+    """
+    return THEME_COLORS.get(theme, THEME_COLORS[DEFAULT_THEME])
 
 
 def apply_theme():
     """
-    Applys the theme to the styles throughout the program
+    Applies the current theme to the frames and the styles
     """
-    bg, fg, border = current_theme
+    bg = current_theme[0]
     menu_frame.config(bg=bg)
+    search_label.config(bg=bg)
     frame.config(bg=bg)
-    style.configure(
-        "Custom.TCombobox",
-        fieldbackground="#FFFFFF",
-        background=bg,
-        bordercolor=bg,
-        arrowsize=14,
-    )
-    style.configure(
-        "Buttons.TButton",
-        background=bg,
-        foreground=fg,
-        bordercolor=border,
-        highlightbackground=fg,
-        highlightthickness=5,
-        focusthickness=0,
-        padding=6,
-        relief="solid"
-    )
-    add_button.configure(style="Buttons.TButton")
-    delete_button.configure(style="Buttons.TButton")
-    settings_button.configure(style="Buttons.TButton")
-    style.configure("Custom.Treeview.Heading",
-                    background=bg,
-                    foreground="black",
-                    relief="flat")
-    window.update_idletasks()
+    apply_styles(current_theme_name)
 
 
 def set_theme(theme):
@@ -567,72 +1237,80 @@ def set_theme(theme):
     global current_theme, current_theme_name
     current_theme_name = theme
     current_theme = get_theme_colors(theme)
-
-    try:
-        with open(resource_path("setup.csv"), "r", newline='') as f:
-            rows = list(csv.reader(f))
-    except FileNotFoundError:
-        rows = []
-
-    if rows:
-        row = rows[0]
-        if len(row) == 0:
-            row = [current_theme_name]
-        else:
-            row[-1] = current_theme_name
-    else:
-        row = [current_theme_name]
-
-    with open(resource_path("setup.csv"), "w", newline='') as f:
-        csv.writer(f).writerow(row)
+    setup.set_theme(theme)
 
     apply_theme()
 
 
+@timed("manage_classes")
 def manage_classes():
     """
     Creates popup for the User to change the name of the
-    classes and then updates the program
+    classes, or add a class, and then updates the program.
+    The classes are listed in a scrolling list and the selected
+    one is renamed in a single entry, so any number of them fit
     """
     popup = tk.Toplevel(window)
     popup.title("Manage Classes")
 
-    entry_widgets = []
-    class_objects = [class1, class2, class3, class4, class5, class6, class7]
+    new_names = classes.names()
 
     tk.Label(popup, text="Edit Class Names:", font=("Arial", 12, "bold")).grid(
-        row=0, column=0, columnspan=2, pady=10
+        row=0, column=0, columnspan=3, pady=10
     )
 
-    for idx, cls_obj in enumerate(class_objects):
-        tk.Label(popup, text=f"Class {idx+1}:").grid(row=idx+1, column=0, sticky=tk.E)
-        entry = ttk.Entry(popup, width=20)
-        entry.insert(0, cls_obj.name)
-        entry.grid(row=idx+1, column=1, padx=5, pady=2)
-        entry_widgets.append(entry)
+    class_list = tk.Listbox(popup, height=15, width=30, exportselection=False)
+    class_list.grid(row=1, column=0, columnspan=2, sticky=tk.NSEW, padx=(5, 0))
+    scrollbar = ttk.Scrollbar(popup, orient=tk.VERTICAL, command=class_list.yview)
+    scrollbar.grid(row=1, column=2, sticky=tk.NS, padx=(0, 5))
+    class_list.config(yscrollcommand=scrollbar.set)
+    class_list.insert(tk.END, *new_names)
 
-    def save_changes(event=None):
+    tk.Label(popup, text="Name:").grid(row=2, column=0, sticky=tk.E)
+    name_text = tk.StringVar()
+    name_entry = ttk.Entry(popup, textvariable=name_text, width=20)
+    name_entry.grid(row=2, column=1, padx=5, pady=2)
+
+    tk.Label(popup, text="New Class:").grid(row=3, column=0, sticky=tk.E)
+    new_entry = ttk.Entry(popup, width=20)
+    new_entry.grid(row=3, column=1, padx=5, pady=2)
+
+    def on_pick(event=None):
+        selection = class_list.curselection()
+        if selection:
+            name_text.set(new_names[selection[0]])
+
+    def rename(*args):
         """
-        Saves the new names of the classes to the csv and across then program
+        Renames the selected class in the list as its name is typed, a blank name keeping the old one
         """
-        global current_theme_name
-        new_names = []
-
-        for entry, cls_obj in zip(entry_widgets, class_objects):
-            name = entry.get().strip()
-            if len(name) > 0:
-                cls_obj.name = name
-                new_names.append(name)
+        selection = class_list.curselection()
+        name = name_text.get().strip()
+        if selection and name and name != new_names[selection[0]]:
+            index = selection[0]
+            new_names[index] = name
+            class_list.delete(index)
+            class_list.insert(index, name)
+            class_list.selection_set(index)
+
+    class_list.bind("<<ListboxSelect>>", on_pick)
+    name_text.trace_add("write", rename)
 
-        with open(resource_path("setup.csv"), "w", newline='') as f:
-            csv.writer(f).writerow(new_names + [current_theme_name])
+    def save_changes(event=None):
+        """
+        Saves the new names of the classes to the class index and across the program
+        """
+        try:
+            classes.set_names(new_names, new_entry.get().strip())
+        except ValueError as error:
+            messagebox.showerror("showerror", str(error))
+            return
 
-        class_choice.config(values=new_names)
+        names = classes.names()
+        setup.classes_changed()
 
-        if current_class.name not in new_names:
-            class_choice.set(new_names[0] if new_names else "")
-        else:
-            class_choice.set(current_class.name)
+        class_choice.config(values=names)
+        class_choice.set(current_class.name)
 
         popup.destroy()
 
@@ -647,137 +1325,252 @@ def manage_classes():
         relief="flat",
         width=10
     )
-    save_button.grid(row=9, column=0, columnspan=2, pady=10)
+    save_button.grid(row=4, column=0, columnspan=3, pady=10)
+
+
+def schedule_midnight_refresh():
+    """
+    Arms a single timer for local midnight that refreshes the days until
+    due shown in the table, and then arms itself for the next midnight
+    """
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    window.after(int((midnight - now).total_seconds() * 1000) + 1000, on_midnight)
+
+
+def on_midnight():
+    current_table.refresh_days()
+    reminder_timer.arm()
+    schedule_midnight_refresh()
+
+
+def remind(due):
+    """
+    Highlights the rows of assignments that have just come due and lists
+    them in a popup, ringing the bell once
+
+    Args:
+        due (list): the (Cls, Assignment) pairs from the reminders heap
+    """
+    for cls_obj, assignment in due:
+        if cls_obj is current_class:
+            current_table.update(assignment)
+    window.bell()
+
+    popup = tk.Toplevel(window)
+    popup.title("Due Now")
+    for cls_obj, assignment in due:
+        tk.Label(
+            popup,
+            text=f"{cls_obj.name}: {assignment.name}, due {assignment.due_date_string} {assignment.due_time}".rstrip()
+        ).pack(anchor=tk.W, padx=10, pady=2)
 
 
+def load_in_background(targets, done, name="Loader", indexed=False):
+    """
+    Loads classes on a background thread so the window keeps responding,
+    then calls done() on the Tk thread. Tk may only be used from its own
+    thread, so the loader is polled with after() every LOAD_POLL_MS instead
+    of calling back from it. If indexed is set, done() also waits until the
+    search index has every loaded class
+
+    Returns:
+        threading.Thread: the loader
+    """
+    def load_all():
+        for cls_obj in targets:
+            cls_obj.ensure_loaded()
+        if indexed:
+            search_index.wait()
+
+    def poll():
+        if thread.is_alive():
+            window.after(LOAD_POLL_MS, poll)
+        else:
+            done()
+
+    thread = threading.Thread(target=load_all, name=name, daemon=True)
+    thread.start()
+    window.after(LOAD_POLL_MS, poll)
+    return thread
+
+
+def prefetch_classes():
+    """
+    Loads the first PREFETCH_LIMIT classes on a background thread, so
+    that switching to them later does not have to wait for their files.
+    Any others are loaded when they are first used. The reminder timer is
+    armed again once they are loaded, since they may have an earlier deadline
+    """
+    load_in_background(list(classes)[:PREFETCH_LIMIT], reminder_timer.arm, name="Prefetch")
+
+
+def on_close():
+    """
+    Saves the window's size and position and writes any changes that have
+    not been saved yet, then closes the app
+    """
+    setup.set("window", "geometry", [window.geometry()])
+    writer.flush()
+    window.destroy()
+
+
+@timed("save_geometry")
 def save_geometry(event=None):
     """
     Saves window size so that it does not resize between actions
     """
+    size = (window.winfo_width(), window.winfo_height())
+    if size != window_size[0]:
+        window_size[0] = size
+        window.minsize(*size)
+
+
+window_size = [None]
+
+
+def on_window_configure(event):
+    """
+    Handles <Configure> for the window, which is also sent for every widget
+    in it. Only the window's own events count, and they are coalesced into
+    one save_geometry() per frame
+    """
+    if event.widget is window:
+        renderer.request("geometry", save_geometry)
+
+
+if __name__ == "__main__":
+    # lets the import process pool start in the packaged app
+    multiprocessing.freeze_support()
+    if "--migrate-to-sqlite" in sys.argv[1:]:
+        registry = ClassRegistry()
+        if os.path.exists(resource_path(CLASS_INDEX)):
+            registry.load()
+        migrate_to_sqlite([cls.file_name for cls in registry] or [f"class{number}.csv" for number in range(1, 8)])
+        sys.exit()
+
+    window = tk.Tk()
+    window.update_idletasks()
     window.minsize(window.winfo_width(), window.winfo_height())
+    renderer = RenderScheduler(window)
+    window.bind("<Configure>", on_window_configure)
+    window.protocol("WM_DELETE_WINDOW", on_close)
+    window.title("Assignment Tracker")
+
+    setup = Settings()
+    setup.load()
+    geometry = setup.get("window", "geometry")
+    if geometry:
+        window.geometry(geometry[0])
+    current_theme_name = setup.theme
+    current_theme = get_theme_colors(current_theme_name)
+    classes = open_classes(setup)
+
+    menu_frame = tk.Frame(window, bg=current_theme[0])
+    menu_frame.pack(side=tk.TOP, fill=tk.X)
+
+    style = ttk.Style()
+    style.theme_use("clam")
+    apply_styles(current_theme_name)
+
+    class_options = tk.StringVar()
+    class_choice = ttk.Combobox(
+        menu_frame,
+        textvariable=class_options,
+        style="Custom.TCombobox",
+        state="readonly",
+        values=classes.names())
+    class_choice.set("Pick a Class")
+    class_choice.pack(side=tk.LEFT, padx=10, pady=5)
+    class_choice.bind("<<ComboboxSelected>>", on_select)
+
+    add_button = ttk.Button(
+        menu_frame,
+        text="Add Assignment",
+        style="Buttons.TButton",
+        command=add_assignment
+    )
+    add_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+    edit_button = ttk.Button(
+        menu_frame,
+        text="Edit Assignment",
+        style = "Buttons.TButton",
+        command=edit_assignment
+    )
+    edit_button.pack(side=tk.LEFT, padx=5, pady=5)
 
-window = tk.Tk()
-window.update_idletasks()
-window.minsize(window.winfo_width(), window.winfo_height())
-window.bind("<Configure>", save_geometry)
-window.title("Assignment Tracker")
-
-current_theme_name = "green"
-current_theme = get_theme_colors(current_theme_name)
-
-names = []
-try:
-    with open(resource_path("setup.csv"), 'r', newline='') as file:
-        for row in csv.reader(file):
-            if row:
-                if len(row) >= 1:
-                    current_theme_name = row[-1]
-                    for name in row[:-1]:
-                        if name.strip() != "":
-                            names.append(name)
-                break
-except FileNotFoundError:
-    default_names = ["Class 1", "Class 2", "Class 3", "Class 4", "Class 5", "Class 6", "Class 7"]
-    with open(resource_path("setup.csv"), "w", newline='') as f:
-        csv.writer(f).writerow(default_names + [current_theme_name])
-    names = default_names
-
-current_theme = get_theme_colors(current_theme_name)
-
-class1 = Cls("Class 1", "class1.csv")
-class2 = Cls("Class 2", "class2.csv")
-class3 = Cls("Class 3", "class3.csv")
-class4 = Cls("Class 4", "class4.csv")
-class5 = Cls("Class 5", "class5.csv")
-class6 = Cls("Class 6", "class6.csv")
-class7 = Cls("Class 7", "class7.csv")
-
-classes = [class1, class2, class3, class4, class5, class6, class7]
-for cls_obj, stored_name in zip(classes, names):
-    cls_obj.name = stored_name
-
-
-menu_frame = tk.Frame(window, bg=current_theme[0])
-menu_frame.pack(side=tk.TOP, fill=tk.X)
-
-style = ttk.Style()
-style.theme_use("clam")
-style.configure(
-    "Custom.TCombobox",
-    fieldbackground="#FFFFFF",
-    background=current_theme[0],
-    bordercolor=current_theme[0],
-    arrowsize=14,
-)
+    delete_button = ttk.Button(
+        menu_frame,
+        text="Delete Assignment",
+        style="Buttons.TButton",
+        command=delete_assignment
+    )
+    delete_button.pack(side=tk.LEFT, padx=5, pady=5)
 
-class_options = tk.StringVar()
-class_choice = ttk.Combobox(
-    menu_frame,
-    textvariable=class_options,
-    style="Custom.TCombobox",
-    state="readonly",
-    values=names)
-class_choice.set("Pick a Class")
-class_choice.pack(side=tk.LEFT, padx=10, pady=5)
-class_choice.bind("<<ComboboxSelected>>", on_select)
-
-style.configure(
-    "Buttons.TButton",
-    background=current_theme[0],
-    foreground=current_theme[1],
-    bordercolor=current_theme[2],
-    highlightbackground=current_theme[1],
-    highlightthickness=5,
-    focusthickness=0,
-    padding=6,
-    relief="solid"
-)
+    agenda_button = ttk.Button(
+        menu_frame,
+        text="Agenda",
+        style="Buttons.TButton",
+        command=show_agenda
+    )
+    agenda_button.pack(side=tk.LEFT, padx=5, pady=5)
 
-add_button = ttk.Button(
-    menu_frame,
-    text="Add Assignment",
-    style="Buttons.TButton",
-    command=add_assignment
-)
-add_button.pack(side=tk.LEFT, padx=5, pady=5)
+    history_button = ttk.Button(
+        menu_frame,
+        text="History",
+        style="Buttons.TButton",
+        command=show_history
+    )
+    history_button.pack(side=tk.LEFT, padx=5, pady=5)
 
-edit_button = ttk.Button(
-    menu_frame,
-    text="Edit Assignment",
-    style = "Buttons.TButton",
-    command=edit_assignment
-)
-edit_button.pack(side=tk.LEFT, padx=5, pady=5)
+    status_filters = {status: tk.BooleanVar(value=True) for status in STATUS_LIST}
+    type_filter = tk.StringVar(value=ALL_TYPES)
+    overdue_filter = tk.BooleanVar(value=False)
 
-delete_button = ttk.Button(
-    menu_frame,
-    text="Delete Assignment",
-    style="Buttons.TButton",
-    command=delete_assignment
-)
-delete_button.pack(side=tk.LEFT, padx=5, pady=5)
+    filter_button = ttk.Button(
+        menu_frame,
+        text="Filter",
+        style="Buttons.TButton",
+        command=filter_assignments
+    )
+    filter_button.pack(side=tk.LEFT, padx=5, pady=5)
 
-settings_button = ttk.Button(
-    menu_frame,
-    text="Settings",
-    style="Buttons.TButton",
-    command=settings
-)
-settings_button.pack(side=tk.LEFT, padx=5, pady=5)
+    import_button = ttk.Button(
+        menu_frame,
+        text="Import",
+        style="Buttons.TButton",
+        command=import_file
+    )
+    import_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+    settings_button = ttk.Button(
+        menu_frame,
+        text="Settings",
+        style="Buttons.TButton",
+        command=settings
+    )
+    settings_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+    search_label = tk.Label(menu_frame, bg=current_theme[0])
+    search_label.pack(side=tk.RIGHT, padx=5, pady=5)
 
-style.configure("Custom.Treeview.Heading",
-                background=current_theme[0],
-                foreground="black",
-                relief="flat")
+    search_text = tk.StringVar()
+    search_entry = ttk.Entry(menu_frame, textvariable=search_text, width=25)
+    search_entry.pack(side=tk.RIGHT, padx=5, pady=5)
+    search_text.trace_add("write", on_search)
 
-frame = tk.Frame(window, borderwidth=3, bg=current_theme[0])
-frame.pack(fill=tk.BOTH, expand=True)
+    frame = tk.Frame(window, borderwidth=3, bg=current_theme[0])
+    frame.pack(fill=tk.BOTH, expand=True)
 
-current_class = class1
-current_table_frame = create_assignment_table(frame)
+    current_class = next(iter(classes))
+    current_table = create_assignment_table(frame)
+    if restore_layout():
+        show_current_class()
 
-apply_theme()
+    reminder_timer = ReminderTimer(window, remind)
+    reminder_timer.arm()
+    schedule_midnight_refresh()
+    window.after_idle(prefetch_classes)
 
-window.mainloop()
-#TODO: re-add strikethrough
\ No newline at end of file
+    window.mainloop()
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Times loading a class of assignments into an AssignmentStore with the cached
+read_due_date() against the previous uncached split/int/date() parsing.
+
+Usage:
+    python benchmarks/date_parsing_benchmark.py [--rows 500000] [--dates 300]
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AssignmentCore
+from AssignmentCore import AssignmentStore, format_due_date
+
+
+def legacy_read_due_date(s):
+    """
+    The parsing done before read_due_date() was cached, returning the same result
+    """
+    try:
+        parts = s.split("/")
+        if len(parts) != 3:
+            return (0, s == "") if s.strip() == "" else (-1, False)
+        parsed = date(int(parts[2]), int(parts[0]), int(parts[1]))
+    except ValueError:
+        return -1, False
+    return parsed.toordinal(), s == format_due_date(parsed)
+
+
+def class_file(rows, distinct_dates, seed=1):
+    """
+    Returns the text of a class csv whose due dates come from a set of distinct_dates dates
+    """
+    rng = random.Random(seed)
+    start = date.today().toordinal()
+    dates = [format_due_date(date.fromordinal(start + offset)) for offset in range(distinct_dates)]
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    for number in range(1, rows + 1):
+        writer.writerow(["Not Started", f"Assignment {number}", rng.choice(dates), "11:59 PM", "Homework", "", "", number])
+    return buffer.getvalue()
+
+
+def time_load(text):
+    """
+    Returns the seconds taken to parse the csv text into an AssignmentStore
+    """
+    started = time.perf_counter()
+    store = AssignmentStore()
+    for item in csv.reader(io.StringIO(text, newline='')):
+        store.append_row(item)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--dates", type=int, default=300, help="number of distinct due dates")
+    args = parser.parse_args()
+
+    text = class_file(args.rows, args.dates)
+    cached = AssignmentCore.read_due_date
+
+    AssignmentCore.read_due_date = legacy_read_due_date
+    before = time_load(text)
+
+    AssignmentCore.read_due_date = cached
+    cached.cache_clear()
+    after = time_load(text)
+
+    print(f"rows:   {args.rows:>10,} ({args.dates} distinct due dates)")
+    print(f"before: {before:>10.3f} s")
+    print(f"after:  {after:>10.3f} s  ({before / after:.2f}x)")
+    print(f"cache:  {cached.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Writes synthetic class1.csv ... classN.csv and setup.csv files for the
+benchmarks, with a mix of statuses, due dates (past, future, blank and not
+written as M/D/YYYY), due times, types and description lengths.
+
+Usage:
+    python benchmarks/generate_data.py DIRECTORY [--rows 100000] [--classes 7] [--seed 1]
+"""
+import argparse
+import csv
+import os
+import random
+from datetime import date
+
+STATUSES = ["Not Started"] * 5 + ["In Progress"] * 2 + ["Complete"] * 3
+TYPES = ["Homework", "Essay", "Exam", "Quiz", "Lab", "Project", "Reading", "Presentation"]
+TIMES = ["11:59 PM", "9:00 AM", "5:00 PM", "12:30 PM", ""]
+WORDS = ("read chapter draft outline revise submit problems review notes lecture figures "
+         "sources bibliography section proof lab report group slides practice").split()
+
+
+def class_rows(count, seed=1):
+    """
+    Yields count rows in class csv order, with ids
+    """
+    rng = random.Random(seed)
+    today = date.today().toordinal()
+    for number in range(1, count + 1):
+        roll = rng.random()
+        if roll < 0.05:
+            due_date = ""
+        else:
+            due = date.fromordinal(today + rng.randint(-120, 240))
+            # some dates are typed with leading zeros, as people do
+            due_date = f"{due.month:02}/{due.day:02}/{due.year}" if roll < 0.1 else f"{due.month}/{due.day}/{due.year}"
+        description = " ".join(rng.choices(WORDS, k=rng.choice([0, 0, 3, 8, 20, 60])))
+        yield [
+            rng.choice(STATUSES),
+            f"{rng.choice(TYPES)} {number}",
+            due_date,
+            rng.choice(TIMES),
+            rng.choice(TYPES),
+            "",
+            description,
+            number,
+        ]
+
+
+def write_class_file(path, count, seed=1):
+    """
+    Writes a class csv with count rows
+    """
+    with open(path, "w", newline="") as file:
+        csv.writer(file).writerows(class_rows(count, seed))
+
+
+def write_setup(path, classes, theme="green"):
+    """
+    Writes a setup.csv naming the given number of classes
+    """
+    with open(path, "w", newline="") as file:
+        csv.writer(file).writerow([f"Class {number}" for number in range(1, classes + 1)] + [theme])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in each class file")
+    parser.add_argument("--classes", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    write_setup(os.path.join(args.directory, "setup.csv"), args.classes)
+    for number in range(1, args.classes + 1):
+        write_class_file(os.path.join(args.directory, f"class{number}.csv"), args.rows, args.seed + number)
+    print(f"wrote {args.classes} classes of {args.rows:,} rows to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Times the hot paths of the tracker on synthetic classes of several sizes and
+prints the results as JSON, so runs on different commits can be compared.
+
+Timed for each size: Cls.open_class parsing the csv (its binary cache is
+deleted before each run, so this compares with commits from before the
+cache), open_class_cached reading the cache instead (for classes of at
+least CACHE_MIN_ROWS rows, smaller ones have no cache), Cls.save_class,
+building Assignment objects, looking up every assignment by id (what Edit
+and Delete do with the selected rows), edits, removals and
+create_assignment_table. The table needs a display; when there is none, Xvfb is started if it is installed and the
+table is skipped otherwise. Everything else only imports AssignmentCore.
+
+Usage:
+    python benchmarks/hot_paths.py [--sizes 1000 10000 100000] [--storage csv]
+                                   [--repeat 3] [--output results.json] [--compare old.json]
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import AssignmentCore
+from AssignmentCore import CACHE_MIN_ROWS, CACHE_SUFFIX, Assignment, Cls, CsvStorage, migrate_to_sqlite, open_storage, writer
+from generate_data import write_class_file
+
+CHANGES = 1000
+
+
+def best_of(repeat, run, setup=None):
+    """
+    Returns the fastest of repeat runs of run(), in seconds. setup() is
+    called before each run and its result is passed to run()
+    """
+    times = []
+    for _ in range(repeat):
+        arguments = (setup(),) if setup else ()
+        started = time.perf_counter()
+        run(*arguments)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def open_class(file_name, storage):
+    cls = Cls(file_name, file_name, storage=CsvStorage(file_name) if storage == "csv" else open_storage(file_name))
+    cls.ensure_loaded()
+    return cls
+
+
+def start_display():
+    """
+    Starts Xvfb when there is no display and it is installed
+
+    Returns:
+        subprocess.Popen: the Xvfb process to stop afterwards, or None
+    """
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None
+    process = subprocess.Popen([xvfb, ":99", "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = ":99"
+    return process
+
+
+def open_window():
+    """
+    Returns a hidden Tk window for timing the table, or the reason there can't be one
+    """
+    try:
+        import tkinter as tk
+    except ImportError as error:
+        return None, str(error)
+    try:
+        window = tk.Tk()
+    except tk.TclError as error:
+        return None, str(error)
+    window.withdraw()
+    return window, None
+
+
+def time_table(window, cls, repeat):
+    """
+    Times create_assignment_table() for a class, including drawing it once
+    """
+    import tkinter as tk
+    import AssignmentTracker
+    AssignmentTracker.window = window
+    AssignmentTracker.current_class = cls
+
+    def setup():
+        return tk.Frame(window)
+
+    def run(frame):
+        AssignmentTracker.create_assignment_table(frame)
+        window.update_idletasks()
+        frame.destroy()
+
+    return best_of(repeat, run, setup)
+
+
+def bench_size(rows, storage, repeat, window):
+    """
+    Returns the results for a class of the given number of rows
+    """
+    file_name = f"class{rows}.csv"
+    write_class_file(file_name, rows)
+    if storage == "sqlite":
+        migrate_to_sqlite([file_name])
+    with open(file_name, newline="") as file:
+        fields = [row[:7] for row in csv.reader(file)]
+
+    def remove_cache():
+        if os.path.exists(file_name + CACHE_SUFFIX):
+            os.remove(file_name + CACHE_SUFFIX)
+
+    results = {
+        "open_class": best_of(repeat, lambda _: open_class(file_name, storage), remove_cache),
+    }
+    if storage == "csv" and rows >= CACHE_MIN_ROWS:
+        results["open_class_cached"] = best_of(repeat, lambda: open_class(file_name, storage))
+    cls = open_class(file_name, storage)
+    results["save_class"] = best_of(repeat, cls.save_class)
+    results["assignment"] = best_of(repeat, lambda: [Assignment(*row) for row in fields])
+
+    ids = list(cls.store.row_of)
+    results["get"] = best_of(repeat, lambda: [cls.get(assignment_id) for assignment_id in ids])
+
+    changed = random.Random(rows).sample(ids, min(CHANGES, len(ids)))
+
+    def edit():
+        for assignment_id in changed:
+            assignment = cls.get(assignment_id)
+            cls.edit(assignment, "Complete", assignment.name, assignment.due_date_string, assignment.due_time,
+                     assignment.type_of_assignment, "", assignment.description)
+
+    results["edit"] = best_of(repeat, edit)
+    writer.wait()
+
+    if window is not None:
+        results["create_assignment_table"] = time_table(window, cls, repeat)
+
+    started = time.perf_counter()
+    for assignment_id in changed:
+        cls.remove(cls.get(assignment_id))
+    results["remove"] = time.perf_counter() - started
+    writer.wait()
+
+    return [{"name": name, "rows": rows, "seconds": round(seconds, 6)} for name, seconds in results.items()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_file):
+    """
+    Prints each result next to the same one in an earlier results file
+    """
+    with open(old_file) as file:
+        old = {(result["name"], result["rows"]): result["seconds"] for result in json.load(file)["results"]}
+    for result in results:
+        before = old.get((result["name"], result["rows"]))
+        change = f"{result['seconds'] / before:6.2f}x" if before else "     new"
+        print(f"{result['name']:>24} {result['rows']:>9,} {result['seconds']:>10.4f} s {change}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON here instead of to stdout")
+    parser.add_argument("--compare", help="an earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    os.environ["ASSIGNMENT_TRACKER_STORAGE"] = args.storage
+    display = start_display()
+    window, reason = open_window()
+    directory = tempfile.mkdtemp(prefix="assignment-bench-")
+    os.chdir(directory)
+    try:
+        results = []
+        for rows in args.sizes:
+            results.extend(bench_size(rows, args.storage, args.repeat, window))
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(directory, ignore_errors=True)
+        if window is not None:
+            window.destroy()
+        if display is not None:
+            display.terminate()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": AssignmentCore.numpy is not None,
+        "storage": args.storage,
+        "repeat": args.repeat,
+        "table_skipped": reason,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
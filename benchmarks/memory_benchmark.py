@@ -0,0 +1,113 @@
+"""
+Compares the memory used to hold a class of assignments in an AssignmentStore
+with the previous representation of one Assignment object (with a __dict__,
+a due date string and a parsed date) per row.
+
+Usage:
+    python benchmarks/memory_benchmark.py [--rows 1000000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AssignmentCore import AssignmentStore
+
+
+class LegacyAssignment:
+    """
+    The Assignment class as it was before AssignmentStore, kept here as the baseline
+    """
+    def __init__(self, status, name, due_date, due_time, type_of_assignment, days_until_due, description,
+                 assignment_id=""):
+        self.id = int(assignment_id) if str(assignment_id).strip().isdigit() else None
+        self.status = status if status.strip() != "" else "Not Started"
+        self.name = name
+        self.due_date_string = due_date
+        self.due_date = self.parse_date(due_date)
+        self.due_time = due_time
+        self.type_of_assignment = type_of_assignment
+        self.description = description
+        self.days_until_due = self.compute_days_until_due()
+        self.complete = (self.status == "Complete")
+
+    def parse_date(self, s):
+        try:
+            parts = s.split("/")
+            if len(parts) != 3:
+                return None
+            return date(int(parts[2]), int(parts[0]), int(parts[1]))
+        except ValueError:
+            return None
+
+    def compute_days_until_due(self):
+        if self.due_date is None:
+            return ""
+        return (self.due_date - date.today()).days
+
+
+def csv_rows(count, seed=1):
+    """
+    Yields rows the way csv.reader produces them from a class file, so every
+    field is a separate string just like when a real file is loaded
+    """
+    rng = random.Random(seed)
+    statuses = ["Not Started", "In Progress", "Complete"]
+    types = ["Homework", "Essay", "Exam", "Quiz", "Lab", "Project"]
+    times = ["11:59 PM", "9:00 AM", "5:00 PM", ""]
+
+    def lines():
+        for number in range(1, count + 1):
+            yield (
+                f"{rng.choice(statuses)},Assignment {number},{rng.randint(1, 12)}/{rng.randint(1, 28)}/"
+                f"{rng.randint(2024, 2027)},{rng.choice(times)},{rng.choice(types)},,"
+                f"{'Read chapter ' + str(rng.randint(1, 30)) if rng.random() < 0.7 else ''},{number}\r\n"
+            )
+
+    return csv.reader(lines())
+
+
+def measure(build):
+    """
+    Returns the memory still allocated by the object that build() returns, in bytes
+    """
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def build_legacy(count):
+    return [LegacyAssignment(*row) for row in csv_rows(count)]
+
+
+def build_store(count):
+    store = AssignmentStore()
+    for row in csv_rows(count):
+        store.append_row(row)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    legacy = measure(lambda: build_legacy(args.rows))
+    store = measure(lambda: build_store(args.rows))
+
+    print(f"rows:              {args.rows:>12,}")
+    print(f"Assignment objects {legacy / 2**20:>12,.1f} MiB  ({legacy / args.rows:,.0f} bytes/row)")
+    print(f"AssignmentStore    {store / 2**20:>12,.1f} MiB  ({store / args.rows:,.0f} bytes/row)")
+    print(f"saved              {1 - store / legacy:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Checks the import pipeline: folded iCalendar lines, all-day and UTC due
+dates, syllabus CSVs whose header is mapped onto the class columns, rows that
+are skipped, and that parsing on a process pool gives the same rows as
+parsing in this process.
+
+Usage:
+    python -m unittest discover tests
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from AssignmentCore import IMPORT_BATCH, Cls, CsvStorage, import_assignments, parse_import, writer
+
+ICS = """BEGIN:VCALENDAR
+BEGIN:VTODO
+SUMMARY:Essay on Hamlet\\, Act
+ ing and staging
+DUE;VALUE=DATE:20300102
+STATUS:IN-PROCESS
+CATEGORIES:Essay,Writing
+DESCRIPTION:Two pages\\nDouble spaced
+END:VTODO
+BEGIN:VEVENT
+SUMMARY:Midterm
+DTSTART:20300301T150000Z
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Lab
+DTSTART;TZID=America/New_York:20300405T091500
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def write_file(file_name, text):
+    with open(file_name, "w", newline="") as file:
+        file.write(text)
+
+
+def write_csv(file_name, rows):
+    with open(file_name, "w", newline="") as file:
+        csv.writer(file).writerows(rows)
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix="assignment-test-")
+        os.chdir(self.directory)
+        open("class1.csv", "w").close()
+
+    def tearDown(self):
+        writer.flush()
+        os.chdir(self.previous)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_ics(self):
+        write_file("calendar.ics", ICS)
+        rows = list(parse_import("calendar.ics"))
+
+        self.assertEqual(rows[0], ["In Progress", "Essay on Hamlet, Acting and staging", "1/2/2030", "", "Essay", "",
+                                   "Two pages\nDouble spaced"])
+        # UTC is changed to local time, which may move the date
+        moment = datetime(2030, 3, 1, 15, tzinfo=timezone.utc).astimezone()
+        suffix = "AM" if moment.hour < 12 else "PM"
+        self.assertEqual(rows[1][1:4], ["Midterm", f"{moment.month}/{moment.day}/{moment.year}",
+                                        f"{moment.hour % 12 or 12}:{moment.minute:02d} {suffix}"])
+        # other time zones are read as local
+        self.assertEqual(rows[2][1:4], ["Lab", "4/5/2030", "9:15 AM"])
+
+    def test_csv_header_is_mapped(self):
+        write_csv("syllabus.csv", [
+            ["Notes", "Due", "Title", "Ignored", "Category"],
+            ["read ch. 1", "2030-01-02", "Reading", "x", "Homework"],
+            ["", "", "", "", ""],
+            ["", "1/3/2030", "Quiz 1", "", ""],
+        ])
+        self.assertEqual(list(parse_import("syllabus.csv")), [
+            ["", "Reading", "1/2/2030", "", "Homework", "", "read ch. 1"],
+            ["", "Quiz 1", "1/3/2030", "", "", "", ""],
+        ])
+
+    def test_csv_without_header_is_in_class_order(self):
+        write_csv("syllabus.csv", [["Not Started", "Reading", "1/2/2030", "9:00 AM", "Homework", "12", "ch. 1"]])
+        self.assertEqual(list(parse_import("syllabus.csv")),
+                         [["Not Started", "Reading", "1/2/2030", "9:00 AM", "Homework", "", "ch. 1"]])
+
+    def test_bad_rows_are_skipped_and_counted(self):
+        write_csv("syllabus.csv", [
+            ["Name", "Due Date"],
+            ["Reading", "1/2/2030"],
+            ["", "1/3/2030"],
+            ["Quiz", "13/45/2030"],
+            ["reading", "2030-01-02"],
+            ["Exam", ""],
+        ])
+        cls = Cls("Class 1", "class1.csv", storage=CsvStorage("class1.csv"))
+        counts = import_assignments(cls, "syllabus.csv")
+
+        self.assertEqual(counts, {"added": 2, "no name": 1, "invalid date": 1, "duplicate": 1})
+        self.assertEqual(sorted(assignment.name for assignment in cls.assignment_list), ["Exam", "Reading"])
+        self.assertEqual(import_assignments(cls, "syllabus.csv")["duplicate"], 3)
+
+    def test_pool_matches_serial(self):
+        rows = [["Name", "Due", "Type", "Notes"]]
+        rows.extend([f"Assignment {number}", f"2030-{number % 12 + 1:02d}-{number % 28 + 1:02d}", "Homework",
+                     f"notes, {number}"] for number in range(IMPORT_BATCH * 2 + 500))
+        write_csv("syllabus.csv", rows)
+        write_file("calendar.ics", ICS * 3)
+
+        for file_name in ("syllabus.csv", "calendar.ics"):
+            serial = list(parse_import(file_name, workers=1))
+            self.assertEqual(list(parse_import(file_name, workers=2)), serial, file_name)
+        self.assertEqual(len(serial), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
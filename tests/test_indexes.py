@@ -0,0 +1,125 @@
+"""
+Checks that the indexes a class keeps up to date as it changes (the agenda,
+the reminders, the sort orders and the row filters) end up the same as
+indexes built from scratch, after a random run of adds, edits, removals and
+archiving.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from AssignmentCore import (
+    SORT_KEYS, Agenda, Assignment, Cls, CsvStorage, Reminders, RowFilters, SortOrders, agenda, format_due_date,
+    reminders, row_filters, sort_orders, writer,
+)
+
+FILE_NAME = "class1.csv"
+STATUSES = ["Not Started", "In Progress", "Complete"]
+TYPES = ["Homework", "Exam", "Lab", ""]
+TIMES = ["", "8:00 AM", "11:59 PM", "12:00 PM", "3:30 PM"]
+STEPS = 400
+
+
+def random_fields(generator):
+    """
+    Returns the fields of a random assignment, due from a month ago to a
+    month from now, today or not at all
+    """
+    offset = generator.choice([None, 0, 0, generator.randint(-30, 30)])
+    due_date = "" if offset is None else format_due_date(date.today() + timedelta(days=offset))
+    return [generator.choice(STATUSES), f"assignment {generator.randint(0, 50)}", due_date,
+            generator.choice(TIMES), generator.choice(TYPES), "", generator.choice(["", "notes"])]
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix="assignment-test-")
+        os.chdir(self.directory)
+        open(FILE_NAME, "w").close()
+        self.now = datetime.combine(date.today(), time(12, 0))
+        self.cls = Cls("Class 1", FILE_NAME, storage=CsvStorage(FILE_NAME))
+        self.cls.ensure_loaded()
+
+    def tearDown(self):
+        writer.flush()
+        os.chdir(self.previous)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_steps(self, seed):
+        generator = random.Random(seed)
+        cls = self.cls
+        for _ in range(STEPS):
+            assignments = cls.assignment_list
+            action = generator.random()
+            if action < 0.45 or not assignments:
+                cls.add(Assignment(*random_fields(generator)))
+            elif action < 0.8:
+                cls.edit(generator.choice(assignments), *random_fields(generator))
+            elif action < 0.95:
+                cls.remove(generator.choice(assignments))
+            else:
+                cls.archive(generator.sample(assignments, min(len(assignments), 3)))
+
+    def assert_indexes_match(self):
+        cls = self.cls
+        store = cls.store
+
+        fresh = Agenda()
+        fresh.add_class(cls, store)
+        self.assertEqual([key for key in agenda.keys if key[2] == FILE_NAME], fresh.keys)
+
+        fresh = Reminders()
+        fresh.add_class(cls, store)
+        self.assertEqual({entry: due for entry, due in reminders.due_of.items() if entry[0] == FILE_NAME},
+                         fresh.due_of)
+        self.assertTrue(set(reminders.due_of.items()) <= {(item[1:], item[0]) for item in reminders.heap})
+
+        fresh = SortOrders()
+        for column in SORT_KEYS:
+            self.assertEqual(sort_orders.sorted_ids(cls, column), fresh.sorted_ids(cls, column), column)
+
+        fresh = RowFilters()
+        for statuses in (None, ["Complete"], ["Not Started", "In Progress"]):
+            for types in (None, ["Exam"], ["Homework", ""]):
+                for overdue in (False, True):
+                    self.assertEqual(row_filters.rows(cls, statuses, types, overdue, self.now),
+                                     fresh.rows(cls, statuses, types, overdue, self.now), (statuses, types, overdue))
+
+    def test_indexes_match_a_rebuild(self):
+        # build the sort orders and bitmaps first, so they are patched as the class changes
+        for column in SORT_KEYS:
+            sort_orders.sorted_ids(self.cls, column)
+        row_filters.rows(self.cls)
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                self.run_steps(seed)
+                self.assert_indexes_match()
+
+    def test_overdue_today_depends_on_the_time(self):
+        today = format_due_date(date.today())
+        for name, due_time in (("morning", "8:00 AM"), ("noon", "12:00 PM"), ("night", "11:59 PM"), ("no time", "")):
+            self.cls.add(Assignment("Not Started", name, today, due_time, "Exam", "", ""))
+
+        def overdue():
+            store = self.cls.store
+            rows = row_filters.rows(self.cls, overdue=True, now=self.now)
+            return sorted(store.names[row] for row in store.live_rows() if rows >> row & 1)
+
+        self.assertEqual(overdue(), ["morning", "noon"])
+        self.cls.edit(self.cls.assignment_list[0], "Not Started", "morning", today, "1:00 PM", "Exam", "", "")
+        self.assertEqual(overdue(), ["noon"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+"""
+Checks that a class survives crashes: the journal is replayed on top of the
+csv, a torn last record is cut off, a journal left behind by an interrupted
+compaction is not applied twice, the binary cache gives the same rows as
+parsing the csv and is ignored once the csv changes, and archiving survives a
+torn gzip member.
+
+Usage:
+    python -m unittest discover tests
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import AssignmentCore
+from AssignmentCore import (
+    ARCHIVE_SUFFIX, CACHE_SUFFIX, JOURNAL_SUFFIX, Assignment, AssignmentStore, Cls, CsvStorage, decode_record,
+    writer,
+)
+
+FILE_NAME = "class1.csv"
+ROWS = [
+    ["Not Started", "a", "1/2/2030", "11:59 PM", "Essay", "", "first", 1],
+    ["Complete", "b", "02/03/2030", "", "Lab", "", "", 2],
+    ["In Progress", "c", "", "9:00 AM", "Exam", "", "has, a comma", 3],
+]
+COLUMNS = ["ids", "due_ordinals", "status_codes", "type_codes", "time_codes", "names", "descriptions",
+           "raw_due_dates", "alive", "row_of"]
+
+
+def open_class():
+    cls = Cls("Class 1", FILE_NAME, storage=CsvStorage(FILE_NAME))
+    cls.ensure_loaded()
+    return cls
+
+
+def journal_records():
+    with open(FILE_NAME + JOURNAL_SUFFIX, "rb") as file:
+        return [decode_record(line) for line in file]
+
+
+def names(cls):
+    return sorted(cls.store.names[row] for row in cls.store.live_rows())
+
+
+class StorageTest(unittest.TestCase):
+    def setUp(self):
+        # the test class is far smaller than a class that gets a cache
+        patcher = mock.patch.object(AssignmentCore, "CACHE_MIN_ROWS", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.previous = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix="assignment-test-")
+        os.chdir(self.directory)
+        with open(FILE_NAME, "w", newline="") as file:
+            csv.writer(file).writerows(ROWS)
+
+    def tearDown(self):
+        writer.flush()
+        os.chdir(self.previous)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def change(self):
+        """
+        Adds d, renames a to a2 and removes b, then writes them to the journal
+        """
+        cls = open_class()
+        cls.add(Assignment("Not Started", "d", "3/4/2030", "", "Quiz", "", ""))
+        first = cls.get(1)
+        cls.edit(first, first.status, "a2", first.due_date_string, first.due_time, first.type_of_assignment, "",
+                 first.description)
+        cls.remove(cls.get(2))
+        writer.flush()
+        return cls
+
+    def test_journal_is_replayed(self):
+        with open(FILE_NAME, "rb") as file:
+            original = file.read()
+        self.change()
+        with open(FILE_NAME, "rb") as file:
+            self.assertEqual(file.read(), original)
+        self.assertTrue(os.path.exists(FILE_NAME + JOURNAL_SUFFIX))
+
+        cls = open_class()
+        self.assertEqual(names(cls), ["a2", "c", "d"])
+        self.assertEqual(cls.get(1).name, "a2")
+        self.assertNotIn(2, cls.store.row_of)
+
+    def test_torn_record_is_cut_off(self):
+        self.change()
+        journal = FILE_NAME + JOURNAL_SUFFIX
+        size = os.path.getsize(journal)
+        with open(journal, "ab") as file:
+            file.write(b'0badc0de {"op":"add","row":["Not Started","torn"')
+
+        cls = open_class()
+        self.assertEqual(names(cls), ["a2", "c", "d"])
+        self.assertEqual(os.path.getsize(journal), size)
+
+    def test_corrupt_record_stops_replay(self):
+        self.change()
+        journal = FILE_NAME + JOURNAL_SUFFIX
+        with open(journal, "rb") as file:
+            lines = file.readlines()
+        # the base line, then the add of d; the edit's checksum no longer matches
+        lines[2] = lines[2].replace(b"a2", b"a3")
+        with open(journal, "wb") as file:
+            file.writelines(lines)
+
+        self.assertEqual(names(open_class()), ["a", "b", "c", "d"])
+
+    def test_journal_of_replaced_csv_is_discarded(self):
+        # a crash after compaction swapped in the new csv but before it
+        # started the journal again, whose changes the csv already has
+        cls = self.change()
+        journal = FILE_NAME + JOURNAL_SUFFIX
+        shutil.copy(journal, "old.log")
+        cls.save_class()
+        self.assertEqual([record["op"] for record in journal_records()], ["base"])
+        os.replace("old.log", journal)
+
+        cls = open_class()
+        self.assertEqual(names(cls), ["a2", "c", "d"])
+        self.assertEqual([record["op"] for record in journal_records()], ["base"])
+
+    def test_crash_before_csv_swap(self):
+        # a crash while compaction was still writing the temporary csv
+        cls = self.change()
+        journal = FILE_NAME + JOURNAL_SUFFIX
+        shutil.copy(FILE_NAME, "old.csv")
+        shutil.copy(journal, "old.log")
+        cls.save_class()
+        os.replace("old.csv", FILE_NAME)
+        os.replace("old.log", journal)
+        with open(FILE_NAME + ".tmp", "w") as file:
+            file.write("Not Started,half writ")
+
+        self.assertEqual(names(open_class()), ["a2", "c", "d"])
+
+    def test_removed_ids_are_not_reused(self):
+        cls = open_class()
+        cls.add(Assignment("Not Started", "d", "", "", "Quiz", "", ""))
+        cls.remove(cls.get(4))
+        writer.flush()
+        self.assertEqual(open_class().next_id, 5)
+
+        cls.save_class()
+        self.assertEqual(open_class().next_id, 5)
+
+    def test_removed_ids_are_not_reused_after_a_crash_during_compaction(self):
+        cls = open_class()
+        cls.add(Assignment("Not Started", "d", "", "", "Quiz", "", ""))
+        cls.remove(cls.get(4))
+        writer.flush()
+        shutil.copy(FILE_NAME + JOURNAL_SUFFIX, "old.log")
+        cls.save_class()
+        os.replace("old.log", FILE_NAME + JOURNAL_SUFFIX)
+
+        self.assertEqual(open_class().next_id, 5)
+
+    def test_cache_matches_csv(self):
+        self.change().save_class()
+        cached = CsvStorage(FILE_NAME).load_cached()
+        self.assertIsNotNone(cached)
+        parsed = AssignmentStore()
+        for row in CsvStorage(FILE_NAME).load():
+            parsed.append_row(row)
+        for column in COLUMNS:
+            self.assertEqual(getattr(cached, column), getattr(parsed, column), column)
+
+    def test_cache_is_used_on_open_and_journal_replayed_on_top(self):
+        open_class()
+        self.assertTrue(os.path.exists(FILE_NAME + CACHE_SUFFIX))
+        self.change()
+        self.assertIsNotNone(CsvStorage(FILE_NAME).load_cached())
+        self.assertEqual(names(open_class()), ["a2", "c", "d"])
+
+    def test_stale_cache_is_ignored(self):
+        open_class()
+        status = os.stat(FILE_NAME)
+        os.utime(FILE_NAME, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(CsvStorage(FILE_NAME).load_cached(), "same contents, only the mtime changed")
+
+        with open(FILE_NAME, "a", newline="") as file:
+            csv.writer(file).writerow(["Not Started", "e", "", "", "", "", "", 4])
+        self.assertIsNone(CsvStorage(FILE_NAME).load_cached())
+        self.assertEqual(names(open_class()), ["a", "b", "c", "e"])
+
+    def test_small_class_has_no_cache(self):
+        open_class()
+        with mock.patch.object(AssignmentCore, "CACHE_MIN_ROWS", len(ROWS) + 1):
+            self.change().save_class()
+        self.assertFalse(os.path.exists(FILE_NAME + CACHE_SUFFIX))
+        self.assertEqual(names(open_class()), ["a2", "c", "d"])
+
+    def test_damaged_cache_is_ignored(self):
+        open_class()
+        cache = FILE_NAME + CACHE_SUFFIX
+        with open(cache, "r+b") as file:
+            file.truncate(os.path.getsize(cache) - 5)
+        self.assertIsNone(CsvStorage(FILE_NAME).load_cached())
+        self.assertEqual(names(open_class()), ["a", "b", "c"])
+
+    def test_archive_and_restore_are_written_by_the_writer(self):
+        cls = open_class()
+        archive = FILE_NAME + ARCHIVE_SUFFIX
+        self.assertEqual(cls.archive_done(), 1)
+        self.assertFalse(os.path.exists(archive))
+        self.assertEqual([assignment.name for assignment in cls.archived()], ["b"])
+        writer.flush()
+        self.assertEqual(names(open_class()), ["a", "c"])
+
+        cls.restore(cls.archived())
+        self.assertEqual(cls.archived(), [])
+        self.assertEqual(len(open_class().archived()), 1, "not written yet")
+        writer.flush()
+        cls = open_class()
+        self.assertEqual(cls.archived(), [])
+        self.assertEqual(names(cls), ["a", "b", "c"])
+
+    def test_torn_archive_member_is_skipped(self):
+        cls = open_class()
+        cls.archive([cls.get(1)])
+        writer.flush()
+        archive = FILE_NAME + ARCHIVE_SUFFIX
+        with open(archive, "rb") as file:
+            member = file.read()
+        with open(archive, "ab") as file:
+            file.write(member[:len(member) // 2])
+        cls.archive([cls.get(3)])
+        writer.flush()
+
+        self.assertEqual([assignment.name for assignment in open_class().archived()], ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()